@@ -0,0 +1,183 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional
+
+# proxies in front of the API that append to X-Forwarded-For; 0 trusts none,
+# since a client can send any X-Forwarded-For it likes
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+# every worker has its own limiter, so each enforces its share of the global limit
+WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of being queued."""
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+def client_key(headers, peer: Optional[str]) -> str:
+    """
+    Rate-limit key for a request: the client's network address. Behind
+    TRUSTED_PROXY_HOPS proxies it is the X-Forwarded-For entry added by the
+    outermost trusted proxy, so users behind a load balancer are not one
+    bucket. Client-supplied IDs (user_id, headers) are deliberately ignored:
+    they are unauthenticated, so rotating them would dodge the limit, and
+    the mobile app sends the same user_id from every install.
+    """
+    if TRUSTED_PROXY_HOPS > 0:
+        forwarded = [hop.strip() for hop in headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        if len(forwarded) >= TRUSTED_PROXY_HOPS:
+            return f"ip:{forwarded[-TRUSTED_PROXY_HOPS]}"
+    return f"ip:{peer or 'anonymous'}"
+
+class TokenBucket:
+    """
+    Classic token bucket: refills at `rate` tokens per second up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def retry_after(self, tokens: float = 1.0) -> float:
+        """seconds until `tokens` will be available"""
+        return max(0.0, (tokens - self.tokens) / self.rate) if self.rate > 0 else 60.0
+
+class RateLimiter:
+    """
+    Per-user and global token-bucket rate limiting.
+    Per-user buckets are kept in an LRU bounded by max_users.
+    """
+
+    def __init__(self, user_rate: float, user_burst: float,
+                 global_rate: float, global_burst: float, max_users: int = 10_000):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_users = max_users
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.user_buckets = OrderedDict()
+
+    def check(self, user_key: str):
+        """Raise Overloaded if either the user's or the global budget is exhausted."""
+        bucket = self.user_buckets.get(user_key)
+        if bucket is None:
+            bucket = TokenBucket(self.user_rate, self.user_burst)
+            self.user_buckets[user_key] = bucket
+            if len(self.user_buckets) > self.max_users:
+                self.user_buckets.popitem(last=False)
+        else:
+            self.user_buckets.move_to_end(user_key)
+
+        if not bucket.try_acquire():
+            raise Overloaded("per-user rate limit exceeded", bucket.retry_after())
+        if not self.global_bucket.try_acquire():
+            # give the user their token back, the global limit is not their fault
+            bucket.tokens = min(bucket.capacity, bucket.tokens + 1)
+            raise Overloaded("global rate limit exceeded", self.global_bucket.retry_after())
+
+class DependencyGate:
+    """
+    Bounded concurrency and queue for one external dependency (Gemini, translation).
+
+    At most max_in_flight calls run at once and at most max_queue wait behind them.
+    Waiters whose deadline cannot be met, judged from an EWMA of recent call
+    durations, are shed immediately instead of timing out later.
+    """
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, initial_latency: float = 1.0):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+        self.avg_latency = initial_latency
+        self.shed = 0
+        self.completed = 0
+
+    def _expected_wait(self) -> float:
+        """rough time until a new waiter would get a slot"""
+        return (self.waiting + 1) * self.avg_latency / self.max_in_flight
+
+    @asynccontextmanager
+    async def slot(self, timeout: Optional[float] = None):
+        """
+        Acquire a slot within `timeout` seconds or raise Overloaded.
+        `timeout` is the time left until the caller's deadline.
+        """
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self.shed += 1
+                raise Overloaded(f"{self.name} queue full", self.avg_latency)
+            if timeout is not None and self._expected_wait() + self.avg_latency > timeout:
+                self.shed += 1
+                raise Overloaded(f"{self.name} deadline cannot be met", self.avg_latency)
+
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout)
+            except asyncio.TimeoutError:
+                self.shed += 1
+                raise Overloaded(f"{self.name} queue wait exceeded deadline", self.avg_latency)
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        self.in_flight += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            self.avg_latency = 0.8 * self.avg_latency + 0.2 * elapsed
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "avg_latency_s": round(self.avg_latency, 3),
+            "completed": self.completed,
+            "shed": self.shed,
+        }
+
+rate_limiter = RateLimiter(
+    user_rate=float(os.getenv("RATE_LIMIT_USER_RPS", "1")),
+    user_burst=float(os.getenv("RATE_LIMIT_USER_BURST", "5")),
+    global_rate=float(os.getenv("RATE_LIMIT_GLOBAL_RPS", "50")) / WORKERS,
+    global_burst=max(1.0, float(os.getenv("RATE_LIMIT_GLOBAL_BURST", "100")) / WORKERS),
+)
+
+gemini_gate = DependencyGate(
+    "gemini",
+    max_in_flight=int(os.getenv("GEMINI_MAX_IN_FLIGHT", "8")),
+    max_queue=int(os.getenv("GEMINI_MAX_QUEUE", "32")),
+    initial_latency=2.0,
+)
+
+translation_gate = DependencyGate(
+    "translation",
+    max_in_flight=int(os.getenv("TRANSLATION_MAX_IN_FLIGHT", "16")),
+    max_queue=int(os.getenv("TRANSLATION_MAX_QUEUE", "64")),
+    initial_latency=1.0,
+)
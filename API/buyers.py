@@ -0,0 +1,220 @@
+import os
+import math
+import threading
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+BUYERS_PATH = os.getenv("BUYERS_PATH", "API/buyers.csv")
+CELL_DEG = 0.5            # spatial grid for nearest-buyer queries, ~55 km cells
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG = 111.32
+SCAN_LIMIT = 5000         # filtered sets this small are ranked by distance directly
+MAX_PAGE_SIZE = 100
+
+def _key(text):
+    return str(text).strip().lower()
+
+def _ring(row0, col0, ring):
+    """grid cells on the square ring at Chebyshev distance `ring` from (row0, col0)"""
+    if ring == 0:
+        yield row0, col0
+        return
+    for c in range(col0 - ring, col0 + ring + 1):
+        yield row0 - ring, c
+        yield row0 + ring, c
+    for r in range(row0 - ring + 1, row0 + ring):
+        yield r, col0 - ring
+        yield r, col0 + ring
+
+def _haversine_km(lat, long, lats, longs):
+    lat1, lon1 = np.radians(lat), np.radians(long)
+    lat2, lon2 = np.radians(lats), np.radians(longs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+class BuyerDirectory:
+    """
+    Verified-buyer directory loaded from BUYERS_PATH into memory.
+
+    Rows are kept as columns; crop, state and (state, district) map to sorted
+    row-id arrays, so filters are array intersections rather than scans. A
+    CELL_DEG grid over lat/long answers nearest-buyer queries by searching
+    rings of cells outward from the farmer until the page is complete.
+
+    CSV columns: id, name, organisation, phone, crops (';'-separated),
+    state, district, lat, long.
+    """
+
+    def __init__(self, path: str = BUYERS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        df = pd.read_csv(self.path, dtype={"id": str, "phone": str}, keep_default_na=False)
+        lats = pd.to_numeric(df["lat"], errors="coerce").to_numpy(np.float64)
+        longs = pd.to_numeric(df["long"], errors="coerce").to_numpy(np.float64)
+
+        crops, states, districts = {}, {}, {}
+        for i, (crop_list, state, district) in enumerate(zip(df["crops"], df["state"], df["district"])):
+            for crop in filter(None, (_key(c) for c in str(crop_list).split(";"))):
+                crops.setdefault(crop, []).append(i)
+            states.setdefault(_key(state), []).append(i)
+            districts.setdefault((_key(state), _key(district)), []).append(i)
+
+        located = np.flatnonzero(~(np.isnan(lats) | np.isnan(longs)))
+        cells = {}
+        if len(located):
+            rows = np.floor(lats[located] / CELL_DEG).astype(np.int64)
+            cols = np.floor(longs[located] / CELL_DEG).astype(np.int64)
+            order = np.lexsort((cols, rows))
+            keys = np.stack([rows[order], cols[order]], axis=1)
+            bounds = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+            for chunk in np.split(np.arange(len(order)), bounds):
+                cells[(int(keys[chunk[0], 0]), int(keys[chunk[0], 1]))] = np.sort(located[order[chunk]])
+
+        as_index = lambda table: {key: np.array(ids, dtype=np.int64) for key, ids in table.items()}
+        with self._lock:
+            self.records = [
+                {
+                    "id": row.id,
+                    "name": row.name,
+                    "organisation": row.organisation,
+                    "phone": row.phone,
+                    "crops": [c.strip() for c in str(row.crops).split(";") if c.strip()],
+                    "state": row.state,
+                    "district": row.district,
+                    "lat": None if np.isnan(lat) else float(lat),
+                    "long": None if np.isnan(lon) else float(lon),
+                }
+                for row, lat, lon in zip(df.itertuples(index=False), lats, longs)
+            ]
+            self.lats, self.longs = lats, longs
+            self.located = ~(np.isnan(lats) | np.isnan(longs))
+            self.located_count = int(self.located.sum())
+            self.by_crop = as_index(crops)
+            self.by_state = as_index(states)
+            self.by_district = as_index(districts)
+            self.cells = cells
+            if cells:
+                grid = np.array(list(cells))
+                self._grid_min, self._grid_max = grid.min(axis=0), grid.max(axis=0)
+                self._max_abs_lat = float(np.abs(lats[located]).max())
+
+    def __len__(self):
+        return len(self.records)
+
+    def _filtered(self, crop=None, state=None, district=None):
+        """sorted row ids matching every given filter, or None when unfiltered"""
+        sets = []
+        if crop:
+            sets.append(self.by_crop.get(_key(crop), np.empty(0, dtype=np.int64)))
+        if state and district:
+            sets.append(self.by_district.get((_key(state), _key(district)), np.empty(0, dtype=np.int64)))
+        elif state:
+            sets.append(self.by_state.get(_key(state), np.empty(0, dtype=np.int64)))
+        elif district:
+            sets.append(np.concatenate(
+                [ids for (_, d), ids in self.by_district.items() if d == _key(district)] or [np.empty(0, dtype=np.int64)]
+            ))
+        if not sets:
+            return None
+        ids = min(sets, key=len)
+        for other in sets:
+            if other is not ids:
+                ids = np.intersect1d(ids, other, assume_unique=True)
+        return np.sort(ids)
+
+    def _nearest(self, lat, long, ids, needed, max_distance_km):
+        """(row ids, distances) of the `needed` nearest rows, restricted to `ids` if given"""
+        if ids is not None and len(ids) <= SCAN_LIMIT:
+            candidates = ids[self.located[ids]]
+        else:
+            allowed = None
+            if ids is not None:
+                allowed = np.zeros(len(self.records), dtype=bool)
+                allowed[ids] = True
+            row0, col0 = math.floor(lat / CELL_DEG), math.floor(long / CELL_DEG)
+            # km per cell step in the worst direction (longitude shrinks with latitude)
+            step_km, max_ring = 0.0, 0
+            if self.cells:
+                worst_lat = min(89.0, max(abs(lat), self._max_abs_lat))
+                step_km = CELL_DEG * KM_PER_DEG * math.cos(math.radians(worst_lat))
+                max_ring = int(max(abs(row0 - self._grid_min[0]), abs(row0 - self._grid_max[0]),
+                                   abs(col0 - self._grid_min[1]), abs(col0 - self._grid_max[1])))
+            found, ring = [], 0
+            count = 0
+            while ring <= max_ring:
+                for key in _ring(row0, col0, ring):
+                    cell = self.cells.get(key)
+                    if cell is None:
+                        continue
+                    if allowed is not None:
+                        cell = cell[allowed[cell]]
+                    if len(cell):
+                        found.append(cell)
+                        count += len(cell)
+                # anything outside the searched square is at least ring * step_km away
+                reach_km = ring * step_km
+                if max_distance_km is not None and reach_km > max_distance_km:
+                    break
+                # with a distance limit the search covers the whole radius so the total is exact
+                if max_distance_km is None and count >= needed:
+                    seen = np.concatenate(found)
+                    distances = _haversine_km(lat, long, self.lats[seen], self.longs[seen])
+                    if np.partition(distances, needed - 1)[needed - 1] <= reach_km:
+                        break
+                ring += 1
+            candidates = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+        distances = _haversine_km(lat, long, self.lats[candidates], self.longs[candidates])
+        if max_distance_km is not None:
+            keep = distances <= max_distance_km
+            candidates, distances = candidates[keep], distances[keep]
+        order = np.lexsort((candidates, distances))
+        return candidates[order], distances[order]
+
+    def search(self, crop: Optional[str] = None, state: Optional[str] = None, district: Optional[str] = None,
+               lat: Optional[float] = None, long: Optional[float] = None, max_distance_km: Optional[float] = None,
+               page: int = 1, page_size: int = 20) -> dict:
+        """
+        Filter buyers by crop, state and district, optionally ordered by distance
+        from (lat, long), and return one page.
+
+        Returns:
+            dict: total, page, page_size, buyers as [name, organisation, phone]
+                  rows and details (id, crops, state, district, lat, long and,
+                  for location queries, distance_km) for the same rows
+        """
+        page = max(1, page)
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        start = (page - 1) * page_size
+        with self._lock:
+            ids = self._filtered(crop, state, district)
+            distances = None
+            if lat is not None and long is not None:
+                if max_distance_km is None:
+                    total = self.located_count if ids is None else int(np.count_nonzero(self.located[ids]))
+                ids, distances = self._nearest(lat, long, ids, start + page_size, max_distance_km)
+                if max_distance_km is not None:
+                    total = len(ids)
+            else:
+                total = len(self.records) if ids is None else len(ids)
+                if ids is None:
+                    ids = np.arange(start, min(start + page_size, total))
+                    start = 0
+
+            page_ids = ids[start:start + page_size]
+            rows, details = [], []
+            for n, i in enumerate(page_ids.tolist()):
+                record = self.records[i]
+                rows.append([record["name"], record["organisation"], record["phone"]])
+                detail = {key: record[key] for key in ("id", "crops", "state", "district", "lat", "long")}
+                if distances is not None:
+                    detail["distance_km"] = round(float(distances[start + n]), 2)
+                details.append(detail)
+
+        return {"total": total, "page": page, "page_size": page_size, "buyers": rows, "details": details}
+
+directory = BuyerDirectory()
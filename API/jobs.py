@@ -0,0 +1,327 @@
+import os
+import csv
+import json
+import time
+import uuid
+import fcntl
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, CancelledError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import pandas as pd
+
+from WeatherAPI.tool_weather_cache import weather_cache, cell_of
+from RecommendationEngine.src import tool_recommender
+from RecommendationEngine.src.tool_recommender import FEATURES
+from RecommendationEngine.src.tool_prices import store as price_store
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = os.getenv("JOBS_DIR", "jobs")
+CHUNK_ROWS = int(os.getenv("JOB_CHUNK_ROWS", "500"))
+# each gunicorn worker runs its own pool, so split the cores between them
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", max(1, multiprocessing.cpu_count() // int(os.getenv("WEB_CONCURRENCY", "1")))))
+# chunks scored concurrently per job, so every pool process has work
+CHUNKS_IN_FLIGHT = int(os.getenv("JOB_CHUNKS_IN_FLIGHT", str(JOB_WORKERS + 1)))
+WEATHER_CONCURRENCY = int(os.getenv("JOB_WEATHER_CONCURRENCY", "8"))
+MAX_JOB_ROWS = int(os.getenv("MAX_JOB_ROWS", "200000"))
+
+REQUIRED_COLUMNS = ["lat", "long", "N", "P", "K", "Ph"]
+RESULT_COLUMNS = ["row", "lat", "long", "crops", "expected_revenues", "error"]
+
+_pool = None
+_pool_lock = threading.Lock()
+_stop = threading.Event()
+_threads = set()
+
+class Interrupted(Exception):
+    """the server is shutting down; the job stays `running` and resumes on next start"""
+
+def _get_pool():
+    """process pool for model inference, created on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn keeps the children clear of the server's threads and gRPC state
+            _pool = ProcessPoolExecutor(
+                max_workers=JOB_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+def _score(features, top_k):
+    """
+    runs in a pool process, which doesn't see the API's reloads, so it picks up
+    new model artifacts and mandi observations itself before scoring
+    """
+    try:
+        tool_recommender.reload_if_changed()
+    except Exception as e:
+        logger.warning(f"Job worker could not reload the model, using the loaded one: {e}")
+    try:
+        price_store.refresh()
+    except Exception as e:
+        logger.warning(f"Job worker could not refresh mandi prices, using the loaded ones: {e}")
+    return tool_recommender.recommend_crop_batch(features, top_k)
+
+def _submit(features, top_k):
+    if _stop.is_set():
+        raise Interrupted()
+    try:
+        return _get_pool().submit(_score, features, top_k)
+    except RuntimeError:
+        # "cannot schedule new futures after shutdown"
+        raise Interrupted()
+
+def _score_result(future, features, top_k):
+    """result of a pool submission, replacing the pool once if a child died"""
+    global _pool
+    try:
+        return future.result()
+    except CancelledError:
+        raise Interrupted()
+    except BrokenProcessPool:
+        if _stop.is_set():
+            raise Interrupted()
+        logger.warning("Job process pool broke, starting a new one")
+        with _pool_lock:
+            if _pool is not None and getattr(_pool, "_broken", False):
+                _pool = None
+        try:
+            return _submit(features, top_k).result()
+        except CancelledError:
+            raise Interrupted()
+
+def _job_dir(job_id):
+    return os.path.join(JOBS_DIR, job_id)
+
+def _read_meta(job_id):
+    with open(os.path.join(_job_dir(job_id), "meta.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_meta(job_id, meta):
+    path = os.path.join(_job_dir(job_id), "meta.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, path)
+
+def submit_job(csv_bytes: bytes, top_k: int = 5) -> str:
+    """
+    Store an uploaded CSV of plots and start processing it in the background.
+
+    The CSV needs columns lat, long, N, P, K, Ph (one plot per row).
+    Returns the job ID.
+    """
+    job_id = uuid.uuid4().hex
+    os.makedirs(_job_dir(job_id))
+    input_path = os.path.join(_job_dir(job_id), "input.csv")
+    with open(input_path, "wb") as f:
+        f.write(csv_bytes)
+
+    header = pd.read_csv(input_path, nrows=0).columns
+    missing = [col for col in REQUIRED_COLUMNS if col not in header]
+    if missing:
+        raise ValueError(f"Missing columns: {missing}")
+    with open(input_path, "rb") as f:
+        total = max(0, sum(1 for _ in f) - 1)
+    if total > MAX_JOB_ROWS:
+        raise ValueError(f"Too many rows (max {MAX_JOB_ROWS})")
+
+    _write_meta(job_id, {
+        "job_id": job_id,
+        "status": "queued",
+        "top_k": top_k,
+        "total": total,
+        "processed": 0,
+        "created": time.time(),
+        "error": None,
+    })
+    start_job(job_id)
+    return job_id
+
+def get_job(job_id: str) -> Optional[dict]:
+    """Current status and progress of a job, or None if it doesn't exist."""
+    try:
+        return _read_meta(job_id)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def results_path(job_id: str) -> str:
+    return os.path.join(_job_dir(job_id), "results.csv")
+
+def start_job(job_id: str):
+    thread = threading.Thread(target=_run_job, args=(job_id,), daemon=True, name=f"job-{job_id}")
+    _threads.add(thread)
+    thread.start()
+
+def resume_jobs():
+    """Restart any job left queued or running by a previous process."""
+    if not os.path.isdir(JOBS_DIR):
+        return
+    for job_id in os.listdir(JOBS_DIR):
+        meta = get_job(job_id)
+        if meta and meta["status"] in ("queued", "running"):
+            logger.info(f"Resuming bulk job {job_id} at row {meta['processed']}")
+            start_job(job_id)
+
+def _weather_for(lat, lon):
+    """shared per-cell weather cache, so plots in one ~1 km cell cost one lookup against the daily budget"""
+    return weather_cache.get(lat, lon, 2024, track_demand=False)
+
+def _completed_rows(path):
+    """
+    Number of input rows already written by an earlier (possibly crashed) run.
+    A torn trailing line from a crash mid-write is cut off first.
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+    done = 0
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            done = int(row["row"]) + 1
+    return done
+
+def _run_job(job_id):
+    lock_file = open(os.path.join(_job_dir(job_id), "lock"), "w")
+    try:
+        # another worker process may already own this job
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        _threads.discard(threading.current_thread())
+        return
+
+    try:
+        meta = _read_meta(job_id)
+        out_path = results_path(job_id)
+        done = _completed_rows(out_path)
+        meta.update(status="running", processed=done)
+        _write_meta(job_id, meta)
+
+        new_file = os.path.getsize(out_path) == 0 if os.path.exists(out_path) else True
+        with open(out_path, "a", newline="", encoding="utf-8") as out, \
+                ThreadPoolExecutor(max_workers=WEATHER_CONCURRENCY) as weather_pool:
+            writer = csv.DictWriter(out, fieldnames=RESULT_COLUMNS)
+            if new_file:
+                writer.writeheader()
+
+            def write(pending):
+                prepared, future, end = pending
+                recommendations = _score_result(future, prepared["features"], meta["top_k"]) if future else []
+                writer.writerows(_finish_chunk(prepared, recommendations))
+                out.flush()
+                os.fsync(out.fileno())
+                meta["processed"] = end
+                _write_meta(job_id, meta)
+
+            # weather for the next chunks is fetched while earlier ones are scored;
+            # results are written in input order, so a restart resumes cleanly
+            in_flight = deque()
+            reader = pd.read_csv(os.path.join(_job_dir(job_id), "input.csv"), chunksize=CHUNK_ROWS)
+            offset = 0
+            for chunk in reader:
+                start, offset = offset, offset + len(chunk)
+                if offset <= done:
+                    continue
+                if _stop.is_set():
+                    raise Interrupted()
+                prepared = _prepare_chunk(chunk.iloc[max(0, done - start):], weather_pool)
+                future = _submit(prepared["features"], meta["top_k"]) if prepared["valid"] else None
+                in_flight.append((prepared, future, offset))
+                if len(in_flight) >= CHUNKS_IN_FLIGHT:
+                    write(in_flight.popleft())
+            while in_flight:
+                write(in_flight.popleft())
+
+        meta.update(status="completed", finished=time.time())
+        _write_meta(job_id, meta)
+        logger.info(f"Bulk job {job_id} completed ({meta['processed']} rows)")
+    except Interrupted:
+        logger.info(f"Bulk job {job_id} interrupted by shutdown, will resume from row {meta['processed']}")
+    except Exception as e:
+        if _stop.is_set():
+            logger.info(f"Bulk job {job_id} interrupted by shutdown ({e}), will resume")
+            return
+        logger.error(f"Bulk job {job_id} failed: {str(e)}")
+        meta = get_job(job_id) or {}
+        meta.update(status="failed", error=str(e))
+        _write_meta(job_id, meta)
+    finally:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+        _threads.discard(threading.current_thread())
+
+def _prepare_chunk(chunk, weather_pool):
+    """
+    Validate a chunk and fetch weather per cell concurrently.
+    Rows with missing or non-numeric inputs, or no weather, get an error instead of a score.
+    """
+    numeric = chunk[REQUIRED_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    invalid = numeric.isna().any(axis=1).to_numpy()
+
+    cells = [
+        None if bad else cell_of(lat, lon)
+        for bad, lat, lon in zip(invalid, numeric["lat"], numeric["long"])
+    ]
+    unique_cells = [cell for cell in dict.fromkeys(cells) if cell is not None]
+    cell_weather = dict(zip(unique_cells, weather_pool.map(lambda c: _weather_for(*c), unique_cells)))
+
+    errors = [None] * len(chunk)
+    valid, features = [], {name: [] for name in FEATURES}
+    for i, (cell, row) in enumerate(zip(cells, numeric.itertuples(index=False))):
+        if cell is None:
+            errors[i] = "Invalid or missing lat, long, N, P, K or Ph"
+            continue
+        weather = cell_weather.get(cell) or {}
+        temperature = weather.get("temperature_c")
+        humidity = weather.get("relative_humidity_percent")
+        rainfall = weather.get("annual_precip_mm")
+        if any(v is None for v in (temperature, humidity, rainfall)):
+            errors[i] = "Weather data unavailable"
+            continue
+        valid.append(i)
+        for name, value in (("N", row.N), ("P", row.P), ("K", row.K),
+                            ("temperature", temperature), ("humidity", humidity),
+                            ("ph", row.Ph), ("rainfall", rainfall)):
+            features[name].append(value)
+    return {"chunk": chunk, "errors": errors, "valid": valid, "features": features}
+
+def _finish_chunk(prepared, recommendations):
+    """result rows for a prepared chunk, given the scores of its valid rows"""
+    results = list(prepared["errors"])
+    for i, recs in zip(prepared["valid"], recommendations):
+        results[i] = recs
+
+    rows = []
+    for (index, row), result in zip(prepared["chunk"].iterrows(), results):
+        ok = isinstance(result, list)
+        rows.append({
+            "row": index,
+            "lat": row["lat"],
+            "long": row["long"],
+            "crops": ";".join(rec["crop"] for rec in result) if ok else "",
+            "expected_revenues": ";".join(str(rec["expected_revenue"]) for rec in result) if ok else "",
+            "error": "" if ok else result,
+        })
+    return rows
+
+def shutdown(timeout: float = 10.0):
+    """
+    Stop job threads between chunks (their status stays `running`, so the
+    next start resumes them), then shut the pool down.
+    """
+    _stop.set()
+    deadline = time.monotonic() + timeout
+    for thread in list(_threads):
+        thread.join(max(0.0, deadline - time.monotonic()))
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
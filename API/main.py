@@ -1,24 +1,50 @@
+import io
 import os
+import json
 import logging
-from fastapi import FastAPI, HTTPException
+from collections import OrderedDict
+from fastapi import FastAPI, HTTPException, Request, Header, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel, validator
 from typing import Optional, List, Dict, Union
 import uvicorn
 import asyncio
 import aiohttp
+import pandas as pd
 from contextlib import asynccontextmanager
 
 # Import existing modules
-from WeatherAPI.tool_weather import get_weather
+from WeatherAPI.tool_weather_cache import weather_cache, prefetcher
+from RecommendationEngine.src import tool_recommender, tool_saturation
+from RecommendationEngine.src.tool_prices import store as price_store
 from RecommendationEngine.src.tool_recommender import recommend_crop
+from RecommendationEngine.src.tool_EcoCrop import find_suitable_crops, find_suitable_crops_batch, is_crop_suitable
+from RecommendationEngine.src.tool_saturation import rerank_by_saturation, summarize_ranking
+from RecommendationEngine.src.tool_neighbours import store as neighbour_store
+from RecommendationEngine.src.tool_tiles import store as tile_store
 from Chatbot.tool_chat import bot
 from Chatbot.analyzer import bot as competition_bot
+from Chatbot.batching import AnalysisBatcher
+from Chatbot.answer_cache import answer_cache
+from API.admission import Overloaded, rate_limiter, gemini_gate, translation_gate, client_key
+from API import jobs
+from API.translation_memory import memory as translation_memory
+from API.profiling import ProfilingMiddleware, window_profiler, is_admin, list_profiles as stored_profiles, load_profile
+from API.response_cache import ArtifactVersion, ResponseCache, response_cache, quantize, etag_matches, CELL_DEG, NPK_STEP, PH_STEP
+from API.buyers import directory as buyer_directory, BUYERS_PATH
+from API.sessions import session_store
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Seconds a request may wait on each external dependency before it is shed
+CHAT_DEADLINE_S = float(os.getenv("CHAT_DEADLINE_S", "20"))
+ANALYSIS_DEADLINE_S = float(os.getenv("ANALYSIS_DEADLINE_S", "8"))
+TRANSLATION_DEADLINE_S = float(os.getenv("TRANSLATION_DEADLINE_S", "10"))
+MAX_LOADED_SESSIONS = int(os.getenv("MAX_LOADED_SESSIONS", "1000"))
+
 # Translation-related Pydantic models
 class TranslationRequest(BaseModel):
     text: str
@@ -45,6 +71,15 @@ class BatchTranslationResponse(BaseModel):
 class CropRecommendation(BaseModel):
     crop: str
     expected_revenue: float
+    ecocrop_suitable: Optional[bool] = None  # EcoCrop tolerance check at this pH, rainfall and temperature
+
+class MarketRankedCrop(BaseModel):
+    crop: str
+    probability: float
+    expected_revenue: float
+    saturation_factor: float
+    adjusted_revenue: float
+    score: float
 
 class CropRecommendationRequest(BaseModel):
     lat: float
@@ -55,6 +90,8 @@ class CropRecommendationRequest(BaseModel):
     Ph: float
     top_k: Optional[int] = 5
     response_language: Optional[str] = "english"  # New field for translation
+    include_llm_analysis: Optional[bool] = False  # Gemini explanation on top of the numeric ranking
+    neighbour_radius_km: Optional[float] = 10.0  # Radius for aggregating neighbouring plantings
     
     @validator('lat')
     def validate_latitude(cls, v):
@@ -80,6 +117,12 @@ class CropRecommendationRequest(BaseModel):
             raise ValueError('top_k must be between 1 and 20')
         return v
 
+    @validator('neighbour_radius_km')
+    def validate_radius(cls, v):
+        if v is not None and not 0 < v <= 100:
+            raise ValueError('neighbour_radius_km must be between 0 and 100')
+        return v
+
     @validator('response_language')
     def validate_language(cls, v):
         if v is not None:
@@ -91,11 +134,56 @@ class CropRecommendationRequest(BaseModel):
 class CropRecommendationResponse(BaseModel):
     weather_data: dict
     recommended_crops: List[CropRecommendation]
+    market_ranking: Optional[List[MarketRankedCrop]] = None  # Saturation-adjusted ranking, best first
     competition_analysis: str
     input_parameters: dict
     language: str  # Language of the response
     translation_status: Optional[str] = None  # Status of translation if applied
 
+class NeighbourPlotRequest(BaseModel):
+    lat: float
+    long: float
+    crop: str
+    acres: float
+
+    @validator('lat')
+    def validate_latitude(cls, v):
+        if not -90 <= v <= 90:
+            raise ValueError('Latitude must be between -90 and 90')
+        return v
+
+    @validator('long')
+    def validate_longitude(cls, v):
+        if not -180 <= v <= 180:
+            raise ValueError('Longitude must be between -180 and 180')
+        return v
+
+    @validator('acres')
+    def validate_acres(cls, v):
+        if v <= 0:
+            raise ValueError('acres must be positive')
+        return v
+
+class SuitableCropsBatchRequest(BaseModel):
+    ph: List[float]
+    rain: List[float]
+    temp: List[float]
+    limit: Optional[int] = None
+
+    @validator('limit')
+    def validate_limit(cls, v):
+        if v is not None and v < 1:
+            raise ValueError('limit must be at least 1')
+        return v
+
+    @validator('temp')
+    def validate_lengths(cls, v, values):
+        if len(v) != len(values.get('ph', [])) or len(v) != len(values.get('rain', [])):
+            raise ValueError('ph, rain and temp must have the same length')
+        if len(v) > 1000:
+            raise ValueError('Batch size too large (max 1000 locations)')
+        return v
+
 class ChatRequest(BaseModel):
     message: str
     user_id: Optional[str] = None
@@ -123,6 +211,7 @@ class ChatResponse(BaseModel):
     conversation_id: Optional[str] = None
     language: str = "english"
     translation_status: Optional[str] = None
+    prompt_tokens: Optional[int] = None  # Estimated prompt tokens sent to the LLM for this turn
 
 # Translation service class
 class LightweightTranslator:
@@ -223,15 +312,25 @@ class LightweightTranslator:
                     service='none'
                 )
             
+            # Local translation memory first, no network needed on a hit
+            remembered = translation_memory.lookup(text, source_lang, target_lang)
+            if remembered is not None:
+                return TranslationResponse(
+                    success=True,
+                    translation=remembered,
+                    service='memory'
+                )
+            
             # Get language codes
             src_code = self.language_codes[source_lang]
             tgt_code = self.language_codes[target_lang]
             
-            # Create async session
-            async with aiohttp.ClientSession() as session:
+            # Create async session once a translation slot is free
+            async with translation_gate.slot(TRANSLATION_DEADLINE_S), aiohttp.ClientSession() as session:
                 # Try MyMemory first
                 translation = await self.translate_mymemory(session, text, src_code, tgt_code)
                 if translation:
+                    translation_memory.learn(text, translation, source_lang, target_lang)
                     return TranslationResponse(
                         success=True,
                         translation=translation,
@@ -241,6 +340,7 @@ class LightweightTranslator:
                 # Fallback to LibreTranslate
                 translation = await self.translate_libretranslate(session, text, src_code, tgt_code)
                 if translation:
+                    translation_memory.learn(text, translation, source_lang, target_lang)
                     return TranslationResponse(
                         success=True,
                         translation=translation,
@@ -269,10 +369,89 @@ class LightweightTranslator:
 
 # Global instances
 translator = LightweightTranslator()
-user_sessions = {}
+analysis_batcher = AnalysisBatcher(
+    competition_bot,
+    gate=gemini_gate,
+    deadline_s=ANALYSIS_DEADLINE_S,
+    window_s=float(os.getenv("ANALYSIS_BATCH_WINDOW_S", "0.05")),
+    max_batch=int(os.getenv("ANALYSIS_BATCH_SIZE", "8"))
+)
+user_sessions = OrderedDict()  # user_id -> GeminiChatbot, a per-worker LRU over session_store
+
+def reload_recommendation_artifacts():
+    """Pick up a retrained model or new price data and drop responses built from the old ones"""
+    logger.info("Model or price data changed on disk, reloading")
+    tool_recommender.reload()
+    tool_saturation.reload()
+    response_cache.clear()
+
+artifact_version = ArtifactVersion(
+    [
+        # retraining publishes a new version directory by replacing this pointer
+        f"{tool_recommender.MODELS_DIR}/{tool_recommender.CURRENT_FILE}",
+        *(f"{tool_recommender.MODELS_DIR}/{name}" for name in tool_recommender.ARTIFACT_FILES),
+        tool_recommender.PRICES_PATH,
+        tool_saturation.NEIGHBOURS_PATH,
+    ],
+    on_change=reload_recommendation_artifacts
+)
+
+def refresh_prices():
+    """Apply mandi observations appended by other workers or the ingest CLI"""
+    if price_store.refresh():
+        response_cache.clear()
+
+price_version = ArtifactVersion(
+    [f"{price_store.store_dir}/series.jsonl", f"{price_store.store_dir}/observations.bin"],
+    on_change=refresh_prices
+)
+
+def reload_tiles():
+    logger.info("Tiles changed on disk, reloading")
+    tile_store.reload()
+
+# generate_tile renames finished tiles into place, which bumps the directory mtime
+tile_version = ArtifactVersion([tile_store.tiles_dir], on_change=reload_tiles)
+
+def refresh_neighbours():
+    """Apply plots registered by other workers or the ingest CLI"""
+    if neighbour_store.refresh():
+        response_cache.clear()
+
+neighbour_version = ArtifactVersion(
+    [f"{neighbour_store.store_dir}/{name}.bin" for name in ("lat", "long", "crop", "acres")],
+    on_change=refresh_neighbours
+)
+
+buyer_cache = ResponseCache(capacity=int(os.getenv("BUYER_CACHE_CAPACITY", "5000")), ttl_s=86400)
+
+def buyer_cache_key(crop=None, state=None, district=None, lat=None, long=None, max_distance_km=None,
+                    page=1, page_size=20):
+    return (
+        (crop or "").strip().lower(), (state or "").strip().lower(), (district or "").strip().lower(),
+        lat, long, max_distance_km, page, page_size, buyers_version.version
+    )
+
+def warm_buyer_cache():
+    """Precompute the first page of the unfiltered list and of every crop and state"""
+    buyer_cache.clear()
+    queries = [{}] + [{"crop": crop} for crop in buyer_directory.by_crop] + [{"state": state} for state in buyer_directory.by_state]
+    for query in queries:
+        result = buyer_directory.search(**query)
+        buyer_cache.put(buyer_cache_key(**query), json.dumps(result, ensure_ascii=False).encode())
+
+def reload_buyers():
+    logger.info("Buyer directory changed on disk, reloading")
+    buyer_directory.load()
+
+buyers_version = ArtifactVersion([BUYERS_PATH], on_change=reload_buyers)
+warm_buyer_cache()
 
 def get_or_create_bot(user_id: Optional[str] = None):
-    """Get existing bot instance for user or create new one"""
+    """
+    Bot instance for the user with their conversation loaded from the shared
+    session store, so the conversation continues whichever worker serves it
+    """
     if user_id is None:
         return bot
     
@@ -280,17 +459,48 @@ def get_or_create_bot(user_id: Optional[str] = None):
         from Chatbot.tool_chat import GeminiChatbot
         user_sessions[user_id] = GeminiChatbot()
         logger.info(f"Created new chatbot session for user: {user_id}")
-    
-    return user_sessions[user_id]
+        if len(user_sessions) > MAX_LOADED_SESSIONS:
+            user_sessions.popitem(last=False)
+    user_sessions.move_to_end(user_id)
+    user_bot = user_sessions[user_id]
+    user_bot.load_state(session_store.load(user_id))
+    return user_bot
+
+def save_session(user_id: Optional[str], user_bot):
+    if user_id is not None:
+        session_store.save(user_id, user_bot.export_state())
+
+def summarize_session(user_id: Optional[str], user_bot):
+    """background task: fold old turns into the summary and persist it"""
+    if user_bot.summarize_if_due():
+        save_session(user_id, user_bot)
+
+def admit(http_request: Request):
+    """Apply per-client and global rate limits, answering 429 when exhausted"""
+    peer = http_request.client.host if http_request.client else None
+    try:
+        rate_limiter.check(client_key(http_request.headers, peer))
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many requests: {e.reason}",
+            headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
 
 # Lifespan context manager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Crop Recommendation API with Translation Support...")
+    jobs.resume_jobs()
+    prefetcher.start()
     yield
-    # Shutdown
+    # Shutdown: runs after uvicorn has finished (or, past graceful_timeout,
+    # abandoned) open requests, so in-flight LLM calls are already settled
     logger.info("Shutting down API...")
+    await prefetcher.stop()
+    # bulk jobs checkpoint between chunks and resume on the next start
+    await asyncio.to_thread(jobs.shutdown)
 
 # Create FastAPI app
 app = FastAPI(
@@ -311,6 +521,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in, admin-gated per-request profiling (X-Profile: 1 + X-Admin-Token)
+app.add_middleware(ProfilingMiddleware)
+
+def require_admin(token: Optional[str]):
+    if not is_admin(token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
 @app.get("/")
 async def root():
     return {
@@ -326,6 +543,12 @@ async def root():
         "supported_languages": translator.get_supported_languages(),
         "endpoints": [
             "/recommend_crops", 
+            "/suitable_crops",
+            "/suitable_crops/batch",
+            "/neighbours",
+            "/jobs",
+            "/tiles",
+            "/prices/{crop}",
             "/chat", 
             "/translate",
             "/batch_translate",
@@ -337,10 +560,39 @@ async def root():
         ]
     }
 
+def quantize_recommendation_request(request: CropRecommendationRequest) -> CropRecommendationRequest:
+    """Snap location and soil values to the response cache grid so equal keys mean equal responses"""
+    return request.model_copy(update={
+        "lat": quantize(request.lat, CELL_DEG),
+        "long": quantize(request.long, CELL_DEG),
+        "N": quantize(request.N, NPK_STEP),
+        "P": quantize(request.P, NPK_STEP),
+        "K": quantize(request.K, NPK_STEP),
+        "Ph": quantize(request.Ph, PH_STEP),
+    })
+
+def cached_json_response(body: bytes, etag: str, max_age: float, cache_status: str) -> Response:
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={max(0, int(max_age))}",
+            "X-Cache": cache_status,
+        }
+    )
+
 @app.post("/recommend_crops", response_model=CropRecommendationResponse)
-async def recommend_crops_endpoint(request: CropRecommendationRequest):
+async def recommend_crops_endpoint(request: CropRecommendationRequest, http_request: Request,
+                                   if_none_match: Optional[str] = Header(None)):
     """
     Get crop recommendations with optional multi-language response.
+
+    Location and soil values are quantized (RESPONSE_CACHE_* settings) and
+    whole responses are cached per quantized input, model/price version and
+    neighbour data; the returned input_parameters show the quantized values
+    the recommendation was computed for. Responses carry an ETag, and a
+    matching If-None-Match is answered with 304.
     
     Args:
         request: CropRecommendationRequest with coordinates, soil params, and optional response_language
@@ -348,11 +600,29 @@ async def recommend_crops_endpoint(request: CropRecommendationRequest):
     Returns:
         CropRecommendationResponse with recommendations and analysis in requested language
     """
+    request = quantize_recommendation_request(request)
+    cache_key = (
+        request.lat, request.long, request.N, request.P, request.K, request.Ph,
+        request.top_k, request.response_language, request.include_llm_analysis,
+        request.neighbour_radius_km, artifact_version.current(), price_version.current(),
+        price_store.version, neighbour_version.current(), len(neighbour_store)
+    )
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        etag, body, max_age = cached
+        if etag_matches(if_none_match, etag):
+            response_cache.not_modified += 1
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": f"public, max-age={int(max_age)}"})
+        return cached_json_response(body, etag, max_age, "HIT")
+
+    # cache hits cost nothing, so only requests that do real work are rate limited
+    admit(http_request)
+    cacheable = True
     try:
         logger.info(f"Processing crop recommendation for coordinates: {request.lat}, {request.long} in {request.response_language}")
         
         # Step 1: Get weather data
-        weather_data = get_weather(lat=request.lat, lon=request.long, year=2024)
+        weather_data = await asyncio.to_thread(weather_cache.get, request.lat, request.long, 2024)
         
         if not weather_data:
             logger.error("Failed to retrieve weather data")
@@ -384,23 +654,38 @@ async def recommend_crops_endpoint(request: CropRecommendationRequest):
         recommended_crops = [
             CropRecommendation(
                 crop=rec["crop"],
-                expected_revenue=rec["expected_revenue"]
+                expected_revenue=rec["expected_revenue"],
+                ecocrop_suitable=is_crop_suitable(rec["crop"], request.Ph, rainfall, temperature)
             )
             for rec in recommendations
         ]
         
-        # Step 3: Get competition analysis
-        logger.info("Running competition analysis")
-        try:
-            suggested_crop_names = [rec["crop"] for rec in recommendations]
-            competition_analysis = competition_bot.generate_response(
-                suggested_crops=suggested_crop_names,
-                temperature=0.7
-            )
-            logger.info("Successfully completed competition analysis")
-        except Exception as e:
-            logger.error(f"Competition analysis failed: {str(e)}")
-            competition_analysis = f"Competition analysis unavailable. Recommended crops based on soil and weather conditions: {', '.join(suggested_crop_names[:3])}."
+        # Step 3: Rank by saturation-adjusted revenue, optionally explained by the LLM
+        radius_km = request.neighbour_radius_km or 10.0
+        neighbour_acres = neighbour_store.aggregate(request.lat, request.long, radius_km) or None
+        market_ranking = rerank_by_saturation(recommendations, neighbour_acres)
+        competition_analysis = summarize_ranking(market_ranking, neighbour_acres)
+        if request.include_llm_analysis:
+            logger.info("Running LLM competition analysis")
+            try:
+                suggested_crop_names = [rec["crop"] for rec in market_ranking]
+                # the batcher takes the gemini_gate slot for the shared call itself
+                llm_analysis = await asyncio.wait_for(
+                    analysis_batcher.analyze(suggested_crop_names, neighbour_acres),
+                    ANALYSIS_DEADLINE_S
+                )
+                if llm_analysis and not llm_analysis.startswith("Error:"):
+                    competition_analysis = llm_analysis
+                    logger.info("Successfully completed competition analysis")
+                else:
+                    cacheable = False
+                    logger.warning(f"Competition analysis unavailable: {llm_analysis}")
+            except (Overloaded, asyncio.TimeoutError) as e:
+                cacheable = False
+                logger.warning(f"Skipping LLM competition analysis under load: {e}")
+            except Exception as e:
+                cacheable = False
+                logger.error(f"Competition analysis failed: {str(e)}")
         
         # Step 4: Translate if needed
         translation_status = "original"
@@ -417,10 +702,12 @@ async def recommend_crops_endpoint(request: CropRecommendationRequest):
                     competition_analysis = translation_result.translation
                     translation_status = f"translated_via_{translation_result.service}"
                 else:
+                    cacheable = False
                     translation_status = f"translation_failed: {translation_result.error}"
                     logger.warning(f"Translation failed: {translation_result.error}")
                     
             except Exception as e:
+                cacheable = False
                 logger.error(f"Translation error: {str(e)}")
                 translation_status = f"translation_error: {str(e)}"
         
@@ -428,6 +715,7 @@ async def recommend_crops_endpoint(request: CropRecommendationRequest):
         response = CropRecommendationResponse(
             weather_data=weather_data,
             recommended_crops=recommended_crops,
+            market_ranking=[MarketRankedCrop(**rec) for rec in market_ranking],
             competition_analysis=competition_analysis,
             language=request.response_language,
             translation_status=translation_status,
@@ -439,12 +727,20 @@ async def recommend_crops_endpoint(request: CropRecommendationRequest):
                 "potassium": request.K,
                 "ph": request.Ph,
                 "top_k": request.top_k,
-                "response_language": request.response_language
+                "response_language": request.response_language,
+                "include_llm_analysis": request.include_llm_analysis,
+                "neighbour_radius_km": radius_km,
+                "neighbour_data": "local" if neighbour_acres else "village_default"
             }
         )
         
         logger.info(f"Successfully processed recommendation with {len(recommended_crops)} crops")
-        return response
+        body = response.model_dump_json().encode()
+        if not cacheable:
+            # degraded answers (LLM or translation unavailable) are served but not remembered
+            return Response(content=body, media_type="application/json", headers={"X-Cache": "BYPASS"})
+        etag = response_cache.put(cache_key, body)
+        return cached_json_response(body, etag, response_cache.ttl_s, "MISS")
         
     except HTTPException:
         raise
@@ -452,17 +748,146 @@ async def recommend_crops_endpoint(request: CropRecommendationRequest):
         logger.error(f"Unexpected error: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error occurred")
 
+@app.post("/neighbours")
+async def register_neighbour_plot(request: NeighbourPlotRequest):
+    """Register a farm plot so nearby farmers see it in their competition analysis"""
+    try:
+        await asyncio.to_thread(neighbour_store.add_plot, request.lat, request.long, request.crop, request.acres)
+        return {"message": "Plot registered", "total_plots": len(neighbour_store)}
+    except Exception as e:
+        logger.error(f"Error registering plot: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to register plot")
+
+@app.get("/neighbours")
+async def nearby_plantings(lat: float, long: float, radius_km: float = 10.0):
+    """Acres planted per crop within radius_km of a location"""
+    if not (-90 <= lat <= 90 and -180 <= long <= 180):
+        raise HTTPException(status_code=400, detail="Invalid coordinates")
+    if not 0 < radius_km <= 100:
+        raise HTTPException(status_code=400, detail="radius_km must be between 0 and 100")
+    neighbour_version.current()
+    return {"radius_km": radius_km, "crops": neighbour_store.aggregate(lat, long, radius_km)}
+
+@app.post("/jobs")
+async def submit_bulk_job(http_request: Request, top_k: int = 5):
+    """
+    Submit a CSV (request body) of plots with columns lat, long, N, P, K, Ph
+    for bulk recommendation. Returns a job ID to poll.
+    """
+    if not 1 <= top_k <= 20:
+        raise HTTPException(status_code=400, detail="top_k must be between 1 and 20")
+    body = await http_request.body()
+    if not body:
+        raise HTTPException(status_code=400, detail="Empty CSV upload")
+    try:
+        job_id = await asyncio.to_thread(jobs.submit_job, body, top_k)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error submitting bulk job: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to submit job")
+    return {"job_id": job_id, "status_url": f"/jobs/{job_id}", "results_url": f"/jobs/{job_id}/results"}
+
+@app.get("/jobs/{job_id}")
+async def bulk_job_status(job_id: str):
+    """Status and progress of a bulk recommendation job"""
+    meta = jobs.get_job(job_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return meta
+
+@app.get("/jobs/{job_id}/results")
+async def bulk_job_results(job_id: str):
+    """Results CSV of a bulk job; partial while the job is still running"""
+    if jobs.get_job(job_id) is None or not os.path.exists(jobs.results_path(job_id)):
+        raise HTTPException(status_code=404, detail="Results not available")
+    return FileResponse(jobs.results_path(job_id), media_type="text/csv", filename=f"{job_id}.csv")
+
+@app.get("/tiles")
+async def list_tiles():
+    """Precomputed regional recommendation tiles available for offline use"""
+    tile_version.current()
+    return {"tiles": tile_store.list()}
+
+@app.get("/tiles/recommend")
+async def tile_recommendation(lat: float, long: float, N: float, P: float, K: float, Ph: float, top_k: Optional[int] = None):
+    """
+    Recommendations served from precomputed tiles (nearest grid cell and soil class),
+    with no weather, model or LLM call. 404 if no tile covers the location,
+    400 if top_k is below 1 or above what the covering tile stores.
+    """
+    if top_k is not None and top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be at least 1")
+    tile_version.current()
+    try:
+        result = tile_store.lookup(lat, long, N, P, K, Ph, top_k)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="No precomputed tile covers this location")
+    tile_name, recommendations = result
+    return {"tile": tile_name, "recommended_crops": recommendations}
+
+@app.get("/tiles/{name}")
+async def download_tile(name: str):
+    """Raw tile file for device caching"""
+    tile_version.current()
+    path = next((tile.path for tile in tile_store.tiles if tile.name == name), None)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Tile not found")
+    return FileResponse(
+        path,
+        media_type="application/octet-stream",
+        filename=f"{name}.npz",
+        headers={"Cache-Control": "public, max-age=86400"}
+    )
+
+@app.get("/suitable_crops")
+async def suitable_crops_endpoint(ph: float, rain: float, temp: float, limit: Optional[int] = None):
+    """
+    List EcoCrop species that tolerate the given pH, annual rainfall (mm) and temperature (C).
+    """
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    crops = find_suitable_crops(ph, rain, temp, limit=limit)
+    return {"count": len(crops), "crops": crops}
+
+@app.post("/suitable_crops/batch")
+async def suitable_crops_batch_endpoint(request: SuitableCropsBatchRequest):
+    """Batched /suitable_crops lookup for many locations at once"""
+    results = find_suitable_crops_batch(request.ph, request.rain, request.temp, limit=request.limit)
+    return {"results": [{"count": len(crops), "crops": crops} for crops in results]}
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request, background_tasks: BackgroundTasks):
     """
     Chat with agricultural assistant with multi-language support.
     """
+    admit(http_request)
     try:
         logger.info(f"Processing chat message for user: {request.user_id or 'anonymous'} in {request.response_language}")
         
         # Get bot response
-        user_bot = get_or_create_bot(request.user_id)
-        bot_response = user_bot.chat(request.message)
+        user_bot = await asyncio.to_thread(get_or_create_bot, request.user_id)
+        first_turn = not user_bot.has_history()
+        
+        # Frequent opening questions are answered from the local cache
+        bot_response = answer_cache.get(request.message) if first_turn else None
+        if bot_response is not None:
+            user_bot.remember(request.message, bot_response)
+        else:
+            try:
+                async with gemini_gate.slot(CHAT_DEADLINE_S):
+                    bot_response = await asyncio.to_thread(user_bot.chat, request.message)
+            except Overloaded as e:
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Assistant is busy: {e.reason}",
+                    headers={"Retry-After": str(max(1, round(e.retry_after)))}
+                )
+            if first_turn and not bot_response.startswith("Error:"):
+                answer_cache.put(request.message, bot_response)
+        await asyncio.to_thread(save_session, request.user_id, user_bot)
         
         # Translate if needed
         translation_status = "original"
@@ -489,12 +914,17 @@ async def chat_endpoint(request: ChatRequest):
             user_id=request.user_id,
             conversation_id=request.user_id,
             language=request.response_language,
-            translation_status=translation_status
+            translation_status=translation_status,
+            prompt_tokens=user_bot.last_prompt_tokens
         )
         
+        # fold old turns into the summary after the reply is sent, not before
+        background_tasks.add_task(summarize_session, request.user_id, user_bot)
         logger.info(f"Successfully processed chat message")
         return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to process chat message")
@@ -554,6 +984,7 @@ async def clear_chat_memory(user_id: Optional[str] = None):
         else:
             if user_id in user_sessions:
                 user_sessions[user_id].clear_memory()
+            if session_store.delete(user_id) or user_id in user_sessions:
                 logger.info(f"Cleared chat memory for user: {user_id}")
             else:
                 logger.info(f"No existing session found for user: {user_id}")
@@ -569,19 +1000,91 @@ async def clear_chat_memory(user_id: Optional[str] = None):
         raise HTTPException(status_code=500, detail="Failed to clear chat memory")
 
 @app.get("/buyers")
-async def get_verified_buyers():
+async def get_verified_buyers(crop: Optional[str] = None, state: Optional[str] = None, district: Optional[str] = None,
+                              lat: Optional[float] = None, long: Optional[float] = None,
+                              max_distance_km: Optional[float] = None, page: int = 1, page_size: int = 20,
+                              if_none_match: Optional[str] = Header(None)):
     """
-    Get a static list of government-verified buyers for farming wholesale.
-    Returns the data as a list of lists.
+    Government-verified buyers for farming wholesale, filtered by crop, state
+    and district and, when lat/long are given, ordered by distance.
+
+    `buyers` holds [name, organisation, phone] rows as before; `details` has
+    the remaining fields for the same rows. Pages are cached; the first page
+    of every crop and state is precomputed when the directory loads.
     """
-    buyers = [
-        ["Rajesh Kumar", "National Agricultural Cooperative Marketing Federation of India Ltd (NAFED)", "+91-9876543210"],
-        ["Anita Sharma", "Food Corporation of India (FCI)", "+91-9811122233"],
-        ["Suresh Patel", "State Farm Produce Marketing Federation Gujarat", "+91-9825098765"],
-        ["Meena Reddy", "Andhra Pradesh State Civil Supplies Corporation", "+91-9849012345"],
-        ["Amit Singh", "Haryana State Cooperative Supply and Marketing Federation (HAFED)", "+91-9810011223"],
-    ]
-    return {"buyers": buyers}
+    if (lat is None) != (long is None):
+        raise HTTPException(status_code=400, detail="lat and long must be given together")
+    if lat is not None and not (-90 <= lat <= 90 and -180 <= long <= 180):
+        raise HTTPException(status_code=400, detail="Invalid coordinates")
+    if page < 1 or not 1 <= page_size <= 100:
+        raise HTTPException(status_code=400, detail="page must be >= 1 and page_size between 1 and 100")
+    if lat is not None:
+        lat, long = quantize(lat, CELL_DEG), quantize(long, CELL_DEG)
+
+    previous_version = buyers_version.version
+    if buyers_version.current() != previous_version:
+        warm_buyer_cache()
+    key = buyer_cache_key(crop, state, district, lat, long, max_distance_km, page, page_size)
+    cached = buyer_cache.get(key)
+    if cached is not None:
+        etag, body, _ = cached
+    else:
+        result = buyer_directory.search(crop, state, district, lat, long, max_distance_km, page, page_size)
+        body = json.dumps(result, ensure_ascii=False).encode()
+        etag = buyer_cache.put(key, body)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json",
+                    headers={"ETag": etag, "Cache-Control": "public, max-age=300"})
+
+@app.get("/prices/{crop}")
+async def crop_prices(crop: str, market: Optional[str] = None):
+    """Rolling 30-day mandi price aggregates for a crop, across markets or for one market"""
+    stats = price_store.series_stats(crop, market) if market else price_store.crop_stats(crop)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No mandi prices for this crop/market")
+    return {"crop": crop, "market": market, "expected_revenue": price_store.revenue(crop), **stats}
+
+@app.post("/admin/prices")
+async def ingest_prices(http_request: Request, x_admin_token: Optional[str] = Header(None)):
+    """Ingest a mandi price CSV (request body); only rows newer than the stored series are added"""
+    require_admin(x_admin_token)
+    body = await http_request.body()
+    if not body:
+        raise HTTPException(status_code=400, detail="Empty CSV upload")
+    try:
+        added = await asyncio.to_thread(price_store.ingest, pd.read_csv(io.BytesIO(body)))
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if added:
+        response_cache.clear()
+    return {"new_observations": added, **price_store.stats()}
+
+@app.post("/admin/profile")
+async def profile_window(seconds: float = 30.0, x_admin_token: Optional[str] = Header(None)):
+    """Sample every thread's stack for `seconds` and return an aggregate profile"""
+    require_admin(x_admin_token)
+    if not 1 <= seconds <= 300:
+        raise HTTPException(status_code=400, detail="seconds must be between 1 and 300")
+    try:
+        return await asyncio.to_thread(window_profiler.run, seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/admin/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Stored profiles, newest last"""
+    require_admin(x_admin_token)
+    return {"profiles": await asyncio.to_thread(stored_profiles)}
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    """Full report for one stored profile"""
+    require_admin(x_admin_token)
+    report = await asyncio.to_thread(load_profile, profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
 
 @app.get("/health")
 async def health_check():
@@ -615,7 +1118,18 @@ async def health_check():
             "competition_analyzer": competition_status,
             "translation": translation_status
         },
-        "active_sessions": len(user_sessions),
+        "active_sessions": len(session_store),
+        "admission": {
+            "gemini": gemini_gate.stats(),
+            "translation": translation_gate.stats(),
+            "analysis_batching": analysis_batcher.stats()
+        },
+        "translation_memory": translation_memory.stats(),
+        "chat_answer_cache": answer_cache.stats(),
+        "recommendation_cache": {**response_cache.stats(), "artifact_version": artifact_version.version},
+        "buyer_directory": {"buyers": len(buyer_directory), "cache": buyer_cache.stats()},
+        "price_store": price_store.stats(),
+        "weather_cache": {**weather_cache.stats(), "prefetch": prefetcher.stats()},
         "supported_languages": len(translator.get_supported_languages()),
         "timestamp": "2025-01-01T00:00:00Z",
         "version": "2.0.0"
@@ -0,0 +1,277 @@
+import io
+import os
+import re
+import sys
+import hmac
+import json
+import time
+import uuid
+import pstats
+import asyncio
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from urllib.parse import parse_qs
+
+# profiling is only available when an admin token is configured
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# reports are files here so any worker can serve a profile taken on another
+PROFILES_DIR = os.getenv("PROFILES_DIR", "profiles")
+MAX_STORED_PROFILES = 50
+TOP_ENTRIES = 40
+
+_PROFILE_ID = re.compile(r"[0-9a-f]{12}")
+_request_lock = asyncio.Lock()
+
+def is_admin(token):
+    if not ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+def _profile_path(profile_id):
+    return os.path.join(PROFILES_DIR, f"{profile_id}.json")
+
+def _store(report, profile_id=None):
+    profile_id = profile_id or uuid.uuid4().hex[:12]
+    report["id"] = profile_id
+    report["created_at"] = time.time()
+    os.makedirs(PROFILES_DIR, exist_ok=True)
+    path = _profile_path(profile_id)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(report, f)
+    os.replace(path + ".tmp", path)
+
+    stored = sorted(
+        (entry for entry in os.scandir(PROFILES_DIR) if entry.name.endswith(".json")),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in stored[:-MAX_STORED_PROFILES]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass  # pruned by another worker
+    return profile_id
+
+def load_profile(profile_id):
+    """Stored report for profile_id, or None"""
+    if not _PROFILE_ID.fullmatch(profile_id):
+        return None
+    try:
+        with open(_profile_path(profile_id), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def list_profiles():
+    """Summaries of the stored reports, oldest first"""
+    if not os.path.isdir(PROFILES_DIR):
+        return []
+    summaries = []
+    for name in os.listdir(PROFILES_DIR):
+        if not name.endswith(".json"):
+            continue
+        report = load_profile(name[:-len(".json")])
+        if report is not None:
+            summaries.append({
+                "id": report["id"], "kind": report["kind"], "path": report.get("path"),
+                "wall_ms": report.get("wall_ms"), "created_at": report.get("created_at"),
+            })
+    summaries.sort(key=lambda summary: summary["created_at"] or 0)
+    return summaries
+
+def _allocation_report(snapshot, top=TOP_ENTRIES):
+    stats = snapshot.statistics("lineno")
+    return {
+        "total_kib": round(sum(stat.size for stat in stats) / 1024, 1),
+        "top": [
+            {"location": str(stat.traceback), "size_kib": round(stat.size / 1024, 1), "count": stat.count}
+            for stat in stats[:top]
+        ],
+    }
+
+def _cprofile_report(profiler, top=TOP_ENTRIES):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+    return out.getvalue()
+
+def _sample_stacks(skip, stacks, leaves):
+    """add one snapshot of every thread's stack, except the idents in skip"""
+    for thread_id, frame in sys._current_frames().items():
+        if thread_id in skip:
+            continue
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        if stack:
+            leaves[stack[0]] += 1
+            stacks[";".join(reversed(stack))] += 1
+
+class _ThreadSampler:
+    """samples every thread but the event loop's until stopped, for work the request hands to threads"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks, self.leaves = Counter(), Counter()
+        self.samples = 0
+        self._loop_thread = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self):
+        skip = {self._loop_thread, threading.get_ident()}
+        while not self._stop.is_set():
+            _sample_stacks(skip, self.stacks, self.leaves)
+            self.samples += 1
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def report(self):
+        return {
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "top_functions": [{"frame": f, "samples": n} for f, n in self.leaves.most_common(TOP_ENTRIES)],
+            "folded_stacks": [{"stack": s, "samples": n} for s, n in self.stacks.most_common(TOP_ENTRIES * 5)],
+        }
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware: a request carrying X-Profile: 1 (or ?profile=1) and a
+    valid X-Admin-Token is run under cProfile and tracemalloc. The report is
+    stored and its ID returned in the X-Profile-Id response header.
+
+    Other requests are passed straight through after one header check, so
+    there is no measurable cost when profiling is not requested.
+
+    cProfile covers the event-loop thread; work the request hands to threads
+    (asyncio.to_thread, executors) is covered by sampling every other thread's
+    stack while the request runs. Both views are process-wide, so requests
+    served concurrently show up in them too; reports say so.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _wants_profile(self, scope):
+        if not ADMIN_TOKEN or scope["type"] != "http":
+            return False
+        headers = dict(scope.get("headers") or [])
+        flag = headers.get(b"x-profile") == b"1"
+        if not flag and b"profile=" in scope.get("query_string", b""):
+            flag = parse_qs(scope["query_string"].decode()).get("profile") == ["1"]
+        return flag and is_admin(headers.get(b"x-admin-token", b"").decode())
+
+    async def __call__(self, scope, receive, send):
+        if not self._wants_profile(scope) or _request_lock.locked() or window_profiler.running:
+            await self.app(scope, receive, send)
+            return
+
+        async with _request_lock:
+            profile_id = uuid.uuid4().hex[:12]
+
+            async def send_with_id(message):
+                if message["type"] == "http.response.start":
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile_id.encode())]
+                await send(message)
+
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start(10)
+            profiler = cProfile.Profile()
+            sampler = _ThreadSampler()
+            start = time.perf_counter()
+            sampler.start()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                profiler.disable()
+                sampler.stop()
+                elapsed = time.perf_counter() - start
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                if started_tracing:
+                    tracemalloc.stop()
+                report = {
+                    "kind": "request",
+                    "path": scope.get("path"),
+                    "method": scope.get("method"),
+                    "wall_ms": round(elapsed * 1000, 2),
+                    "peak_traced_kib": round(peak / 1024, 1),
+                    "includes_concurrent_traffic": True,
+                    "note": "cprofile, threads and allocations cover the whole process while this "
+                            "request ran, including any requests served concurrently",
+                    "cprofile": _cprofile_report(profiler),
+                    "threads": sampler.report(),
+                    "allocations": _allocation_report(snapshot),
+                }
+                _store(report, profile_id)
+
+class WindowProfiler:
+    """
+    Sampling profiler over a time window. A background thread snapshots the
+    stacks of every thread (including asyncio.to_thread workers) at a fixed
+    interval and counts folded stacks and leaf functions.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = False
+
+    def _sample(self, seconds, interval, stacks, leaves):
+        skip = {threading.get_ident()}
+        deadline = time.monotonic() + seconds
+        samples = 0
+        while time.monotonic() < deadline:
+            _sample_stacks(skip, stacks, leaves)
+            samples += 1
+            time.sleep(interval)
+        return samples
+
+    def run(self, seconds, interval=0.005, trace_allocations=True):
+        """Blocking: sample for `seconds` and return a report. Raises RuntimeError if already running."""
+        if _request_lock.locked() or not self._lock.acquire(blocking=False):
+            raise RuntimeError("Another profile is already running")
+        try:
+            self.running = True
+            started_tracing = trace_allocations and not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start(10)
+            before = tracemalloc.take_snapshot() if trace_allocations else None
+
+            stacks, leaves = Counter(), Counter()
+            samples = self._sample(seconds, interval, stacks, leaves)
+
+            report = {
+                "kind": "window",
+                "seconds": seconds,
+                "interval_ms": interval * 1000,
+                "samples": samples,
+                "top_functions": [{"frame": f, "samples": n} for f, n in leaves.most_common(TOP_ENTRIES)],
+                "folded_stacks": [{"stack": s, "samples": n} for s, n in stacks.most_common(TOP_ENTRIES * 5)],
+            }
+            if trace_allocations:
+                after = tracemalloc.take_snapshot()
+                report["allocation_growth"] = [
+                    {"location": str(stat.traceback), "size_diff_kib": round(stat.size_diff / 1024, 1),
+                     "count_diff": stat.count_diff}
+                    for stat in after.compare_to(before, "lineno")[:TOP_ENTRIES]
+                ]
+                if started_tracing:
+                    tracemalloc.stop()
+            _store(report)
+            return report
+        finally:
+            self.running = False
+            self._lock.release()
+
+window_profiler = WindowProfiler()
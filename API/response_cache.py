@@ -0,0 +1,140 @@
+import os
+import time
+import zlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+# quantization steps for the cache key; 0 disables quantization for that input
+CELL_DEG = float(os.getenv("RESPONSE_CACHE_CELL_DEG", "0.01"))   # same ~1 km cells as the weather cache
+NPK_STEP = float(os.getenv("RESPONSE_CACHE_NPK_STEP", "5"))      # kg/ha, soil test resolution
+PH_STEP = float(os.getenv("RESPONSE_CACHE_PH_STEP", "0.1"))
+TTL_S = float(os.getenv("RESPONSE_CACHE_TTL_S", os.getenv("WEATHER_TTL_S", "3600")))
+CAPACITY = int(os.getenv("RESPONSE_CACHE_CAPACITY", "20000"))
+VERSION_CHECK_S = 5.0
+
+logger = logging.getLogger(__name__)
+
+def quantize(value: float, step: float) -> float:
+    """snap to the nearest multiple of step (rounded to drop float noise)"""
+    if not step:
+        return value
+    return round(round(value / step) * step, 6)
+
+class ArtifactVersion:
+    """
+    Version string for a set of files (model pickles, price tables), derived
+    from their size and mtime. Files are re-stat'ed at most every `check_s`
+    seconds; when anything changed, `on_change` runs (reload the artifacts)
+    before the new version is reported, so every worker picks up a retrained
+    model or new prices on its own. If on_change fails, the error is logged,
+    the old version stays current and the reload is retried on the next check.
+    """
+
+    def __init__(self, paths: Iterable[str], on_change: Optional[Callable[[], None]] = None,
+                 check_s: float = VERSION_CHECK_S):
+        self.paths = list(paths)
+        self.on_change = on_change
+        self.check_s = check_s
+        self._lock = threading.Lock()
+        self._signature = self._stat()
+        self._checked = time.monotonic()
+        self.version = self._hash(self._signature)
+
+    def _stat(self):
+        signature = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                signature.append((path, st.st_size, st.st_mtime_ns))
+            except OSError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    @staticmethod
+    def _hash(signature):
+        return format(zlib.crc32(repr(signature).encode()), "08x")
+
+    def current(self) -> str:
+        now = time.monotonic()
+        if now - self._checked < self.check_s:
+            return self.version
+        with self._lock:
+            self._checked = now
+            signature = self._stat()
+            if signature != self._signature:
+                if self.on_change is not None:
+                    try:
+                        self.on_change()
+                    except Exception as e:
+                        logger.error(f"Reloading {self.paths} failed, keeping the loaded version: {e}")
+                        return self.version
+                self._signature = signature
+                self.version = self._hash(signature)
+        return self.version
+
+class ResponseCache:
+    """
+    LRU cache of serialized responses keyed by quantized request inputs.
+
+    Entries hold the encoded JSON body and its ETag, so a hit is one dict
+    lookup and no re-serialization.
+    """
+
+    def __init__(self, capacity: int = CAPACITY, ttl_s: float = TTL_S):
+        self.capacity = capacity
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (created, etag, body)
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key):
+        """(etag, body, seconds left) for a fresh entry, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry[0] >= self.ttl_s:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2], self.ttl_s - (now - entry[0])
+
+    def put(self, key, body: bytes) -> str:
+        """Store a response body and return its ETag."""
+        etag = '"' + format(zlib.crc32(body), "08x") + format(len(body), "x") + '"'
+        with self._lock:
+            self._entries[key] = (time.time(), etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        return etag
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+response_cache = ResponseCache()
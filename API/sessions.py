@@ -0,0 +1,53 @@
+import os
+import json
+import hashlib
+from typing import Optional
+
+# chat memory lives here rather than in a worker, so any worker can continue
+# a conversation and a recycled worker loses nothing
+SESSIONS_DIR = os.getenv("SESSIONS_DIR", "sessions")
+
+class SessionStore:
+    """
+    Chat memory per user_id, one JSON file each (named by a hash of the ID).
+
+    Writes go through a per-process temp file and os.replace, so readers
+    never see a partial file. Two concurrent turns for the same user on
+    different workers are last-writer-wins.
+    """
+
+    def __init__(self, sessions_dir: str = SESSIONS_DIR):
+        self.sessions_dir = sessions_dir
+
+    def _path(self, user_id):
+        digest = hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.sessions_dir, f"{digest}.json")
+
+    def load(self, user_id: str) -> Optional[dict]:
+        try:
+            with open(self._path(user_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, user_id: str, state: dict):
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        path = self._path(user_id)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def delete(self, user_id: str) -> bool:
+        try:
+            os.remove(self._path(user_id))
+            return True
+        except OSError:
+            return False
+
+    def __len__(self):
+        if not os.path.isdir(self.sessions_dir):
+            return 0
+        return sum(1 for name in os.listdir(self.sessions_dir) if name.endswith(".json"))
+
+session_store = SessionStore()
@@ -0,0 +1,151 @@
+import os
+import re
+import json
+import threading
+from typing import Optional
+
+SEED_PATH = "API/translation_memory.json"
+LEARNED_PATH = os.getenv("TRANSLATION_MEMORY_PATH", "translation_memory/learned.jsonl")
+MAX_ENTRIES = int(os.getenv("TRANSLATION_MEMORY_MAX_ENTRIES", "50000"))
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+_SPACES = re.compile(r"\s+")
+
+def _normalize(text):
+    """case- and whitespace-insensitive key"""
+    return _SPACES.sub(" ", text).strip().lower()
+
+class TranslationMemory:
+    """
+    Local translation memory consulted before any network provider.
+
+    Lookups try, in order:
+      1. the exact text (and its normalized form) from earlier translations
+      2. every sentence as a template, with numbers and known crop names
+         replaced by placeholders ({n0}, {c0}) and filled back in from the
+         crop-name table, so formulaic output translates fully in-process
+
+    Seeded from SEED_PATH; successful provider results are learned and
+    appended to LEARNED_PATH so the memory survives restarts.
+    """
+
+    def __init__(self, seed_path: str = SEED_PATH, learned_path: Optional[str] = LEARNED_PATH):
+        self.learned_path = learned_path
+        self._lock = threading.Lock()
+        self.crops = {}      # target -> english crop -> translated crop
+        self.segments = {}   # (source, target) -> normalized template -> translated template
+        self.exact = {}      # (source, target) -> normalized text -> translation
+        self.hits = 0
+        self.misses = 0
+
+        if seed_path and os.path.exists(seed_path):
+            with open(seed_path, encoding="utf-8") as f:
+                seed = json.load(f)
+            self.crops = seed.get("crops", {})
+            for target, templates in seed.get("segments", {}).items():
+                pair = self.segments.setdefault(("english", target), {})
+                for template, translation in templates.items():
+                    pair[_normalize(template)] = translation
+
+        # whole-word crop names, longest first so "muskmelon" wins over "melon"-like prefixes
+        names = sorted({crop for table in self.crops.values() for crop in table}, key=len, reverse=True)
+        self._crop_pattern = re.compile(r"\b(" + "|".join(map(re.escape, names)) + r")\b", re.IGNORECASE) if names else None
+
+        if learned_path and os.path.exists(learned_path):
+            with open(learned_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line
+                    self.learn(entry["text"], entry["translation"], entry["source"], entry["target"], persist=False)
+
+    def _templatize(self, segment, source):
+        """replace numbers (and crop names, for English) with indexed placeholders"""
+        values = {}
+
+        def placeholder(kind):
+            def sub(match):
+                key = f"{kind}{sum(1 for k in values if k.startswith(kind))}"
+                values[key] = match.group(0)
+                return "{" + key + "}"
+            return sub
+
+        template = _NUMBER.sub(placeholder("n"), segment)
+        if source == "english" and self._crop_pattern is not None:
+            template = self._crop_pattern.sub(placeholder("c"), template)
+        return template, values
+
+    def _fill(self, template, values, target):
+        crop_table = self.crops.get(target, {})
+        for key, value in values.items():
+            if key.startswith("c"):
+                value = crop_table.get(value.lower(), value)
+            template = template.replace("{" + key + "}", value)
+        return template
+
+    def lookup(self, text: str, source: str, target: str) -> Optional[str]:
+        """Translation from memory, or None if any part of the text is unknown."""
+        pair = (source, target)
+        exact = self.exact.get(pair, {}).get(_normalize(text))
+        if exact is not None:
+            self.hits += 1
+            return exact
+
+        templates = self.segments.get(pair)
+        if templates:
+            translated = []
+            for segment in _SENTENCE_SPLIT.split(text.strip()):
+                template, values = self._templatize(segment, source)
+                translation = templates.get(_normalize(template))
+                if translation is None:
+                    break
+                translated.append(self._fill(translation, values, target))
+            else:
+                self.hits += 1
+                return " ".join(translated)
+
+        self.misses += 1
+        return None
+
+    def learn(self, text: str, translation: str, source: str, target: str, persist: bool = True):
+        """Remember a provider translation, as an exact entry and, when safe, as a template."""
+        if not text or not translation or text == translation:
+            return
+        with self._lock:
+            exact = self.exact.setdefault((source, target), {})
+            if len(exact) >= MAX_ENTRIES:
+                return
+            exact[_normalize(text)] = translation
+
+            # single sentences become templates if every number survives verbatim
+            if len(_SENTENCE_SPLIT.split(text.strip())) == 1:
+                template, values = self._templatize(text, source)
+                learned = translation
+                ok = bool(values)
+                crop_table = self.crops.get(target, {})
+                for key, value in values.items():
+                    rendered = crop_table.get(value.lower(), value) if key.startswith("c") else value
+                    if learned.count(rendered) != 1:
+                        ok = False
+                        break
+                    learned = learned.replace(rendered, "{" + key + "}")
+                if ok:
+                    self.segments.setdefault((source, target), {})[_normalize(template)] = learned
+
+            if persist and self.learned_path:
+                os.makedirs(os.path.dirname(self.learned_path) or ".", exist_ok=True)
+                with open(self.learned_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"source": source, "target": target, "text": text, "translation": translation},
+                                       ensure_ascii=False) + "\n")
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "exact_entries": sum(len(entries) for entries in self.exact.values()),
+            "templates": sum(len(entries) for entries in self.segments.values()),
+        }
+
+memory = TranslationMemory()
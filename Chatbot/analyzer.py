@@ -2,10 +2,14 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage
 from langchain.prompts import PromptTemplate
 import os
+import re
+import json
 from typing import Optional
 # from Chatbot.prompt import competition_handling_prompt  # Commented out since we don't have this file
 from dotenv import load_dotenv
 import csv
+from RecommendationEngine.src.tool_prices import store as price_store
+from RecommendationEngine.src.tool_saturation import local_weight
 
 load_dotenv()
 
@@ -29,6 +33,48 @@ def competition_handling_prompt(surrounding_crops, price_trends, recommended_cro
     Only return the recommended crop name, and a 2 line explanation.
     """
 
+def batch_competition_prompt(price_trends, requests_by_id):
+    """
+    Defines prompt answering several farmers' competition questions in one call.
+    The price context is shared; each request carries its own surrounding
+    plantings and recommended crops, as (surrounding_crops, recommended_crops).
+    """
+    requests_text = "\n".join(
+        f"    {request_id}: Surrounding plantings: {surrounding} Recommended crops: {crops}"
+        for request_id, (surrounding, crops) in requests_by_id.items()
+    )
+    return f"""
+    You are the Krishi AI Sahayak, a helpful agricultural expert, who helps farmers make the best decision on what to plant.
+    The key factor to keep in mind is even if a crop has a high expected revenue, if many farmers around you are planting it, the market will be saturated and you may not get the expected revenue.
+
+    The current market prices for various crops are as follows:
+    {price_trends}
+
+    Several farmers have each been recommended a list of crops, keyed by request ID, along with what the farmers around them have planted:
+{requests_text}
+
+    For each request ID, choose which crop would be most profitable for that farmer to plant.
+    Give the crop name and a 2 line explanation.
+    Respond with only a JSON object mapping each request ID to its answer string, with no other text.
+    """
+
+def parse_batch_response(text, expected_ids):
+    """
+    Parses the JSON object returned for a batch prompt.
+    Returns answers for the request IDs present; callers fall back for the rest.
+    Raises ValueError if the response is not a JSON object.
+    """
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        raise ValueError("No JSON object in batch response")
+    answers = json.loads(match.group(0))
+    if not isinstance(answers, dict):
+        raise ValueError("Batch response is not a JSON object")
+    return {
+        request_id: answers[request_id]
+        for request_id in expected_ids if isinstance(answers.get(request_id), str)
+    }
+
 def read_village_crops(file_path):
     """
     Reads a CSV of neighbouring_crops and acres, 
@@ -57,6 +103,22 @@ def read_village_crops(file_path):
     
     return summary_text, crop_dict
 
+def surrounding_crops_text(neighbour_acres=None):
+    """
+    LLM-friendly summary of the plantings around the farmer, matching what the
+    saturation ranking uses: the nearby plots, plus the village survey while
+    they cover too few acres to stand alone.
+    """
+    acres = {crop: a for crop, a in (neighbour_acres or {}).items() if a > 0}
+    village_text = read_village_crops("RecommendationEngine/artifacts/neighbours_data.csv")[0]
+    if not acres:
+        return village_text
+    summary_text = ", ".join(f"{a:.0f} acres of {crop}" for crop, a in acres.items())
+    summary_text = "Farmers nearby have planted " + summary_text + "."
+    if local_weight(acres) < 1:
+        summary_text += " Few plots nearby are recorded, so weigh them together with the village survey: " + village_text
+    return summary_text
+
 def read_crop_prices(file_path):
     """
     Reads a CSV of crops and total price earned per hectare,
@@ -91,19 +153,16 @@ class SimpleGeminiChat:
         if not self.api_key:
             print("Warning: GOOGLE_API_KEY not found in environment variables")
 
-    def generate_response(self, suggested_crops: list, temperature=0.7):
+    def generate_response(self, suggested_crops: list, temperature=0.7, neighbour_acres=None):
         """
-        Generate a single response from Gemini with improved error handling
+        Generate a single response from Gemini with improved error handling.
+        neighbour_acres (crop -> acres planted nearby) replaces the village survey when given.
         """
         try:
-            # Read data with error handling
-            village_data = read_village_crops("RecommendationEngine/artifacts/neighbours_data.csv")
-            crop_price_data = read_crop_prices("RecommendationEngine/artifacts/crop_prices_yield_revenue.csv")
-
             # Create the prompt
             prompt_input = competition_handling_prompt(
-                surrounding_crops=village_data[0],
-                price_trends=crop_price_data[0],
+                surrounding_crops=surrounding_crops_text(neighbour_acres),
+                price_trends=price_store.price_trends_text(),
                 recommended_crops=", ".join(suggested_crops)
             )
             
@@ -130,4 +189,40 @@ class SimpleGeminiChat:
             traceback.print_exc()
             return f"Error: {str(e)}"
 
+    def generate_batch_response(self, suggested_crops_by_id: dict, temperature=0.7, neighbour_acres_by_id=None):
+        """
+        Answer several competition analyses with a single Gemini call.
+
+        Args:
+            suggested_crops_by_id (dict): Request ID -> list of recommended crops
+            neighbour_acres_by_id (dict): Request ID -> crop -> acres planted near that farmer;
+                requests without an entry use the village survey
+
+        Returns:
+            dict: Request ID -> answer text, for the IDs the model answered
+
+        Raises:
+            ValueError: If the API key is missing or the response can't be parsed
+        """
+        if not self.api_key:
+            raise ValueError("Google API key not found")
+
+        neighbour_acres_by_id = neighbour_acres_by_id or {}
+        prompt_input = batch_competition_prompt(
+            price_trends=price_store.price_trends_text(),
+            requests_by_id={
+                request_id: (surrounding_crops_text(neighbour_acres_by_id.get(request_id)), ", ".join(crops))
+                for request_id, crops in suggested_crops_by_id.items()
+            }
+        )
+
+        llm = ChatGoogleGenerativeAI(
+            model="gemini-2.0-flash-exp",
+            google_api_key=self.api_key,
+            temperature=temperature,
+            max_output_tokens=150 * len(suggested_crops_by_id)
+        )
+        response = llm.invoke([HumanMessage(content=prompt_input)])
+        return parse_batch_response(response.content, list(suggested_crops_by_id))
+
 bot=SimpleGeminiChat()
\ No newline at end of file
@@ -0,0 +1,219 @@
+import os
+import re
+import json
+import time
+import zlib
+import threading
+import unicodedata
+import numpy as np
+
+CROP_TABLE_PATH = "API/translation_memory.json"
+
+_SPACES = re.compile(r"\s+")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+# crops farmers ask about beyond the recommender's table
+_EXTRA_CROPS = {
+    "wheat", "barley", "millet", "bajra", "jowar", "sorghum", "ragi", "paddy", "sugarcane", "soybean",
+    "mustard", "groundnut", "sunflower", "sesame", "potato", "onion", "tomato", "chilli", "chili",
+    "brinjal", "cabbage", "cauliflower", "okra", "garlic", "ginger", "turmeric", "tea", "tobacco",
+    "pea", "peas", "gram", "tur", "arhar", "moong", "urad", "masoor", "chana", "cucumber", "pumpkin",
+    "गेहूं", "गेहूँ", "जौ", "बाजरा", "ज्वार", "गन्ना", "सोयाबीन", "सरसों", "मूंगफली", "आलू", "प्याज",
+    "टमाटर", "मिर्च", "बैंगन", "गोभी", "भिंडी", "लहसुन", "अदरक", "हल्दी", "গম", "আলু", "টমেটো", "মরিচ",
+    "گندم", "آلو", "ٹماٹر", "مرچ",
+}
+_PLACES = {
+    "andhra pradesh", "arunachal pradesh", "assam", "bihar", "chhattisgarh", "goa", "gujarat", "haryana",
+    "himachal pradesh", "jharkhand", "karnataka", "kerala", "madhya pradesh", "maharashtra", "manipur",
+    "meghalaya", "mizoram", "nagaland", "odisha", "orissa", "punjab", "rajasthan", "sikkim", "tamil nadu",
+    "telangana", "tripura", "uttar pradesh", "uttarakhand", "west bengal", "delhi", "jammu", "kashmir",
+    "ladakh", "puducherry", "chandigarh", "north", "south", "east", "west", "hills", "coastal",
+}
+# normalize_question turns "don't" into "don t", so contractions show up as their stem
+_NEGATIONS = {
+    "not", "no", "never", "avoid", "without", "nor", "cannot", "dont", "don", "doesn", "didn", "isn",
+    "aren", "shouldn", "wouldn", "won", "mustn", "nahi", "nahin", "mat", "नहीं", "मत", "না", "نہیں",
+}
+
+def _load_crop_names(path=CROP_TABLE_PATH):
+    """English and translated crop names from the translation memory seed table"""
+    names = set(_EXTRA_CROPS)
+    try:
+        with open(path, encoding="utf-8") as f:
+            table = json.load(f).get("crops", {})
+    except (OSError, ValueError):
+        return names
+    for translations in table.values():
+        for crop, translated in translations.items():
+            names.add(crop)
+            names.add(translated)
+    return names
+
+def normalize_question(text):
+    """
+    NFC, lowercase, punctuation and symbols (Unicode P* and S*) to spaces,
+    whitespace collapsed. Combining vowel signs (Mn/Mc) are kept, so
+    Devanagari, Bengali and Urdu words survive intact.
+    """
+    text = unicodedata.normalize("NFC", text).lower()
+    text = "".join(" " if unicodedata.category(ch)[0] in "PS" else ch for ch in text)
+    return _SPACES.sub(" ", text).strip()
+
+def _term_pattern(terms):
+    # terms are normalized like questions, so words are separated by single spaces;
+    # longest first so "tamil nadu" wins over "tamil"
+    terms = {normalize_question(t) for t in terms} - {""}
+    alternatives = "|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True))
+    return re.compile(rf"(?<!\S)(?:{alternatives})(?!\S)")
+
+_CROP_TERMS = _term_pattern(_load_crop_names())
+_PLACE_TERMS = _term_pattern(_PLACES)
+_NEGATION_WORDS = {normalize_question(word) for word in _NEGATIONS}
+
+def guard_terms(question):
+    """
+    Terms two questions must share exactly for one's answer to serve the
+    other: crops, numbers, places and whether the question is negated.
+    Expects a normalized question.
+    """
+    return (
+        frozenset(_CROP_TERMS.findall(question)),
+        frozenset(_NUMBER.findall(question)),
+        frozenset(_PLACE_TERMS.findall(question)),
+        any(word in _NEGATION_WORDS for word in question.split()),
+    )
+
+class AnswerCache:
+    """
+    Local similarity cache for first-turn chat answers.
+
+    Questions are embedded as hashed word and character n-gram TF-IDF vectors
+    (no network, no model) and kept as rows of a NumPy matrix, so a lookup is
+    one matrix-vector product. Answers above `threshold` cosine similarity
+    are served directly, but only when both questions name the same crops,
+    numbers and places and agree on negation (see guard_terms); n-gram
+    overlap alone cannot tell "urea for rice" from "urea for wheat". Entries expire after `ttl_s`; when full, the least
+    recently used entry is replaced.
+    """
+
+    def __init__(self, dim=2048, capacity=2000, threshold=0.92, ttl_s=7 * 86400, refresh_every=50):
+        self.dim = dim
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.refresh_every = refresh_every
+        self._lock = threading.Lock()
+
+        self._tf = np.zeros((capacity, dim), dtype=np.float32)
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._doc_freq = np.zeros(dim, dtype=np.float32)
+        self._idf = np.ones(dim, dtype=np.float32)
+        self._created = np.zeros(capacity, dtype=np.float64)
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._used = np.zeros(capacity, dtype=bool)
+        self._questions = [None] * capacity
+        self._guards = [None] * capacity
+        self._answers = [None] * capacity
+        self._inserts_since_refresh = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def _features(self, question):
+        words = question.split()
+        grams = words + [" ".join(pair) for pair in zip(words, words[1:])]
+        padded = f" {question} "
+        grams += [padded[i:i + 3] for i in range(len(padded) - 2)]
+        return grams
+
+    def _term_frequencies(self, question):
+        tf = np.zeros(self.dim, dtype=np.float32)
+        for gram in self._features(question):
+            tf[zlib.crc32(gram.encode("utf-8")) % self.dim] += 1.0
+        np.log1p(tf, out=tf)  # sublinear tf
+        return tf
+
+    def _weigh(self, tf):
+        vec = tf * self._idf
+        norm = np.linalg.norm(vec, axis=-1, keepdims=True)
+        return vec / np.maximum(norm, 1e-12)
+
+    def _refresh_idf(self):
+        n = max(1, int(self._used.sum()))
+        self._idf = (np.log((1 + n) / (1 + self._doc_freq)) + 1).astype(np.float32)
+        self._vectors = self._weigh(self._tf) * self._used[:, None]
+        self._inserts_since_refresh = 0
+
+    def get(self, question):
+        """Cached answer for a similar question, or None."""
+        query = normalize_question(question)
+        if not query:
+            return None
+        now = time.time()
+        with self._lock:
+            live = self._used & (now - self._created < self.ttl_s)
+            if live.any():
+                scores = self._vectors @ self._weigh(self._term_frequencies(query))
+                scores[~live] = -1.0
+                candidates = np.flatnonzero(scores >= self.threshold)
+                if len(candidates):
+                    guard = guard_terms(query)
+                    for best in candidates[np.argsort(-scores[candidates])].tolist():
+                        if self._guards[best] == guard:
+                            self._last_used[best] = now
+                            self.hits += 1
+                            return self._answers[best]
+            self.misses += 1
+            return None
+
+    def put(self, question, answer):
+        """Store an answer, replacing an expired or the least recently used entry when full."""
+        query = normalize_question(question)
+        if not query or not answer:
+            return
+        now = time.time()
+        with self._lock:
+            free = np.flatnonzero(~self._used | (now - self._created >= self.ttl_s))
+            slot = int(free[0]) if len(free) else int(self._last_used.argmin())
+            if self._used[slot]:
+                self._doc_freq -= self._tf[slot] > 0
+
+            tf = self._term_frequencies(query)
+            self._tf[slot] = tf
+            self._doc_freq += tf > 0
+            self._vectors[slot] = self._weigh(tf)
+            self._created[slot] = now
+            self._last_used[slot] = now
+            self._used[slot] = True
+            self._questions[slot] = query
+            self._guards[slot] = guard_terms(query)
+            self._answers[slot] = answer
+            self.stores += 1
+
+            self._inserts_since_refresh += 1
+            if self._inserts_since_refresh >= self.refresh_every:
+                self._refresh_idf()
+
+    def clear(self):
+        with self._lock:
+            self._used[:] = False
+            self._doc_freq[:] = 0
+            self._refresh_idf()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": int(self._used.sum()),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+answer_cache = AnswerCache(
+    capacity=int(os.getenv("CHAT_CACHE_CAPACITY", "2000")),
+    threshold=float(os.getenv("CHAT_CACHE_THRESHOLD", "0.92")),
+    ttl_s=float(os.getenv("CHAT_CACHE_TTL_S", str(7 * 86400))),
+)
@@ -0,0 +1,128 @@
+import asyncio
+import itertools
+import logging
+
+logger = logging.getLogger(__name__)
+
+class _Shed(Exception):
+    """the gate refused a call before it started; carries the gate's error"""
+
+    def __init__(self, error):
+        super().__init__(str(error))
+        self.error = error
+
+class AnalysisBatcher:
+    """
+    Micro-batches concurrent competition-analysis requests.
+
+    Requests arriving within window_s of each other (up to max_batch) are
+    answered by one SimpleGeminiChat.generate_batch_response call and the
+    parsed answers are fanned back out. If the batch call fails or leaves
+    some requests unanswered, those fall back to individual generate_response
+    calls.
+
+    Every Gemini call (batched or single) holds one slot of `gate` for as
+    long as its thread runs; waiters hold nothing. If the gate sheds the
+    call, its waiters get the gate's Overloaded error; a shed batch is not
+    retried as single calls, which would only add load to a full gate.
+    """
+
+    def __init__(self, analyzer, gate=None, deadline_s=None, window_s=0.05, max_batch=8, temperature=0.7):
+        self.analyzer = analyzer
+        self.gate = gate
+        self.deadline_s = deadline_s
+        self.window_s = window_s
+        self.max_batch = max_batch
+        self.temperature = temperature
+        self._pending = []
+        self._flush_handle = None
+        self._ids = itertools.count()
+        self.batches = 0
+        self.fallbacks = 0
+
+    async def analyze(self, suggested_crops: list, neighbour_acres: dict = None) -> str:
+        """Queue one analysis, against the plantings near this farmer, and wait for its answer."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((f"r{next(self._ids)}", (list(suggested_crops), neighbour_acres), future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window_s, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _call(self, fn, *args, **kwargs):
+        """
+        run fn in a thread while holding a gate slot until the thread returns;
+        raises _Shed if the gate refuses the slot
+        """
+        if self.gate is None:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        admitted = False
+        try:
+            async with self.gate.slot(self.deadline_s):
+                admitted = True
+                return await asyncio.to_thread(fn, *args, **kwargs)
+        except Exception as e:
+            if admitted:
+                raise
+            raise _Shed(e) from e
+
+    async def _single(self, request):
+        crops, neighbour_acres = request
+        return await self._call(
+            self.analyzer.generate_response, suggested_crops=crops,
+            temperature=self.temperature, neighbour_acres=neighbour_acres
+        )
+
+    async def _run(self, batch):
+        answers = {}
+        if len(batch) > 1:
+            try:
+                answers = await self._call(
+                    self.analyzer.generate_batch_response,
+                    {request_id: crops for request_id, (crops, _), _ in batch},
+                    self.temperature,
+                    {request_id: acres for request_id, (_, acres), _ in batch if acres}
+                )
+                self.batches += 1
+            except _Shed as shed:
+                logger.warning(f"Batched competition analysis shed by the gate: {shed.error}")
+                answers = {request_id: shed.error for request_id, _, _ in batch}
+            except Exception as e:
+                logger.warning(f"Batched competition analysis failed, falling back to single calls: {e}")
+                self.fallbacks += 1
+
+        # waiters that were cancelled or timed out while the batch ran need no answer
+        remaining = [
+            (request_id, request, future) for request_id, request, future in batch
+            if request_id not in answers and not future.done()
+        ]
+        if remaining:
+            results = await asyncio.gather(
+                *(self._single(request) for _, request, _ in remaining), return_exceptions=True
+            )
+            answers.update({request_id: result for (request_id, _, _), result in zip(remaining, results)})
+
+        for request_id, _, future in batch:
+            if future.done():  # waiter was cancelled
+                continue
+            result = answers[request_id]
+            if isinstance(result, _Shed):
+                result = result.error
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "fallbacks": self.fallbacks, "pending": len(self._pending)}
\ No newline at end of file
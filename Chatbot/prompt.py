@@ -28,4 +28,22 @@ def competition_handling_prompt(surrounding_crops, price_trends, recommended_cro
 
     Based on this information, choose which crop would be most profitable for the user to plant, and tell this to the user.
     Provide a very brief explanation for your recommendation.
-    """
\ No newline at end of file
+    """
+
+def summary_prompt(existing_summary, new_lines):
+    """
+    Defines prompt for folding older conversation turns into a running summary.
+    """
+    return f"""
+    Progressively summarize the conversation between a farmer and the Krishi AI Sahayak.
+    Keep crops, locations, soil and weather details, problems and advice already given; drop pleasantries.
+    Return only the updated summary in at most 5 sentences.
+
+    Current summary:
+    {existing_summary or "None"}
+
+    New lines of conversation:
+    {new_lines}
+
+    New summary:
+    """
@@ -1,17 +1,38 @@
 import os
+import threading
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.memory import ConversationBufferWindowMemory
 from langchain.chains import ConversationChain
 from langchain.prompts import PromptTemplate
 from dotenv import load_dotenv
-from Chatbot.prompt import define_prompt
+from Chatbot.prompt import define_prompt, summary_prompt
 
 load_dotenv()
 chat_prompt = define_prompt()
 
+def estimate_tokens(text):
+    """
+    Cheap local token estimate (~4 characters per token for English),
+    avoids a network round trip to count tokens on every turn.
+    """
+    return max(1, len(text) // 4) if text else 0
+
 class GeminiChatbot:
-    def __init__(self, api_key=None, memory_size=10):
+    """
+    Agricultural chatbot with two memory modes:
+      - "window": resend the last memory_size exchanges verbatim
+      - "budget": keep recent exchanges within token_budget and fold older ones
+        into a running summary, refreshed at most every summarize_every turns.
+        The summary call is not part of chat(); callers run summarize_if_due()
+        after the reply has been sent.
+    """
+
+    def __init__(self, api_key=None, memory_size=10, memory_mode=None,
+                 token_budget=1200, summarize_every=4):
         self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        self.memory_mode = memory_mode or os.getenv("CHAT_MEMORY_MODE", "window")
+        if self.memory_mode not in ("window", "budget"):
+            raise ValueError(f"Unsupported memory mode: {self.memory_mode}")
         
         self.llm = ChatGoogleGenerativeAI(
             model="gemini-2.5-flash",
@@ -41,17 +62,153 @@ class GeminiChatbot:
             prompt=self.prompt_template,
             verbose=False
         )
+
+        # budget mode state
+        self.token_budget = token_budget
+        self.summarize_every = summarize_every
+        self.summary = ""
+        self.turns = []
+        self._turns_since_summary = 0
+        self._summary_lock = threading.Lock()
+        self.last_prompt_tokens = None
     
     def chat(self, message):
         try:
+            if self.memory_mode == "budget":
+                return self._chat_budgeted(message)
+            history = self.memory.load_memory_variables({})["history"]
+            self.last_prompt_tokens = estimate_tokens(
+                self.prompt_template.format(history=history, input=message)
+            )
             return self.conversation.predict(input=message)
         except Exception as e:
             return f"Error: {str(e)}"
+
+    def _format_turns(self, turns):
+        return "\n".join(f"Human: {human}\nAI: {ai}" for human, ai in turns)
+
+    def _history(self):
+        """summary plus as many recent turns as fit in the token budget"""
+        budget = self.token_budget - estimate_tokens(self.summary)
+        recent = []
+        for turn in reversed(self.turns):
+            cost = estimate_tokens(self._format_turns([turn]))
+            if recent and cost > budget:
+                break
+            recent.append(turn)
+            budget -= cost
+        recent.reverse()
+
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of earlier conversation: {self.summary}")
+        if recent:
+            parts.append(self._format_turns(recent))
+        return "\n".join(parts)
+
+    def _chat_budgeted(self, message):
+        prompt = self.prompt_template.format(history=self._history(), input=message)
+        self.last_prompt_tokens = estimate_tokens(prompt)
+        response = self.llm.invoke(prompt).content
+
+        self.turns.append((message, response))
+        self._turns_since_summary += 1
+        return response
+
+    def summarize_if_due(self):
+        """
+        Fold old turns into the summary once summarize_every turns have passed.
+        A failed summary call is logged and retried on a later turn; the
+        conversation keeps its turns meanwhile. Returns True if it summarized.
+        """
+        if self.memory_mode != "budget" or self._turns_since_summary < self.summarize_every:
+            return False
+        if not self._summary_lock.acquire(blocking=False):
+            return False  # already summarizing
+        try:
+            self._summarize_overflow()
+            return True
+        except Exception as e:
+            print(f"Warning: conversation summary failed: {e}")
+            return False
+        finally:
+            self._summary_lock.release()
+
+    def _summarize_overflow(self):
+        """fold turns that no longer fit the budget into the running summary"""
+        budget = self.token_budget // 2  # leave headroom so we don't summarize every turn
+        keep = 0
+        for turn in reversed(self.turns):
+            budget -= estimate_tokens(self._format_turns([turn]))
+            if budget < 0:
+                break
+            keep += 1
+        keep = max(keep, 1)
+        overflow = self.turns[:-keep]
+        if not overflow:
+            return
+
+        prompt = summary_prompt(self.summary, self._format_turns(overflow))
+        self.summary = self.llm.invoke(prompt).content.strip()
+        # turns may have been added while the summary call ran
+        self.turns = self.turns[len(overflow):]
+        self._turns_since_summary = 0
     
+    def has_history(self):
+        """True once the conversation has any prior turns"""
+        if self.memory_mode == "budget":
+            return bool(self.turns or self.summary)
+        return bool(self.memory.chat_memory.messages)
+
+    def remember(self, message, response):
+        """record an exchange answered outside the LLM (e.g. from a cache)"""
+        self.last_prompt_tokens = 0
+        if self.memory_mode == "budget":
+            self.turns.append((message, response))
+            self._turns_since_summary += 1
+        else:
+            self.memory.save_context({"input": message}, {"response": response})
+
+    def export_state(self):
+        """conversation memory as plain JSON-serializable data"""
+        if self.memory_mode == "budget":
+            return {
+                "mode": "budget",
+                "summary": self.summary,
+                "turns": [list(turn) for turn in self.turns],
+                "turns_since_summary": self._turns_since_summary,
+            }
+        return {
+            "mode": "window",
+            "messages": [[message.type, message.content] for message in self.memory.chat_memory.messages],
+        }
+
+    def load_state(self, state):
+        """replace conversation memory with state from export_state()"""
+        self.clear_memory()
+        if not state or state.get("mode") != self.memory_mode:
+            return
+        if self.memory_mode == "budget":
+            self.summary = state.get("summary", "")
+            self.turns = [tuple(turn) for turn in state.get("turns", [])]
+            self._turns_since_summary = state.get("turns_since_summary", 0)
+        else:
+            for kind, content in state.get("messages", []):
+                if kind == "human":
+                    self.memory.chat_memory.add_user_message(content)
+                else:
+                    self.memory.chat_memory.add_ai_message(content)
+
     def clear_memory(self):
         self.memory.clear()
+        self.summary = ""
+        self.turns = []
+        self._turns_since_summary = 0
+        self.last_prompt_tokens = None
     
     def get_memory(self):
+        if self.memory_mode == "budget":
+            return self._history()
         return self.memory.buffer
 
 bot=GeminiChatbot()
\ No newline at end of file
@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import ast
 
 df = pd.read_csv("RecommendationEngine/artifacts/processed/cleaned_EcoCrop_DB.csv", encoding="cp1252")
@@ -30,3 +31,114 @@ def get_crop_ranges(crop_name: str):
     
     # convert to list of dicts
     return result_df.to_dict(orient="records")
+
+# column-oriented copies of the tolerance ranges, built once at import
+_names = df["ScientificName"].to_numpy()
+_comnames = df["COMNAME"].to_numpy()
+_ph_min = df["PHMIN"].to_numpy(dtype=np.float64)
+_ph_max = df["PHMAX"].to_numpy(dtype=np.float64)
+_rain_min = df["RMIN"].to_numpy(dtype=np.float64)
+_rain_max = df["RMAX"].to_numpy(dtype=np.float64)
+_temp_min = df["TMIN"].to_numpy(dtype=np.float64)
+_temp_max = df["TMAX"].to_numpy(dtype=np.float64)
+
+def _common_name(name_list):
+    """first common name of a species, without the leading underscore"""
+    return name_list[0].lstrip("_") if name_list else ""
+
+_first_comnames = np.array([_common_name(names) for names in _comnames], dtype=object)
+
+# normalized common name -> row indices, same matching rule as get_crop_ranges
+_name_index = {}
+for _i, _name_list in enumerate(_comnames):
+    for _name in _name_list:
+        _name_index.setdefault(_name.lstrip("_").lower(), []).append(_i)
+
+# classifier labels whose EcoCrop common name is spelled differently
+CLASSIFIER_ALIASES = {
+    "blackgram": "black_gram",
+    "kidneybeans": "kidney_bean",
+    "mothbeans": "moth_bean",
+    "mungbean": "mung_bean",
+    "pigeonpeas": "pigeon_pea",
+    "grapes": "grape",
+    "muskmelon": "melon",
+}
+
+def _suitable_mask(ph, rain, temp):
+    """
+    Boolean mask of species tolerating the given conditions.
+    Inputs may be scalars or 1-D arrays; arrays give one row per location.
+    """
+    ph = np.asarray(ph, dtype=np.float64)[..., None]
+    rain = np.asarray(rain, dtype=np.float64)[..., None]
+    temp = np.asarray(temp, dtype=np.float64)[..., None]
+    return (
+        (_ph_min <= ph) & (ph <= _ph_max)
+        & (_rain_min <= rain) & (rain <= _rain_max)
+        & (_temp_min <= temp) & (temp <= _temp_max)
+    )
+
+def _record(i):
+    return {
+        "ScientificName": _names[i],
+        "COMNAME": _first_comnames[i],
+        "PHMIN": float(_ph_min[i]), "PHMAX": float(_ph_max[i]),
+        "RMIN": float(_rain_min[i]), "RMAX": float(_rain_max[i]),
+        "TMIN": float(_temp_min[i]), "TMAX": float(_temp_max[i]),
+    }
+
+# result records are built once so queries only gather them (treat as read-only)
+_all_records = [_record(i) for i in range(len(df))]
+
+def _records(idx, limit=None):
+    if limit is not None:
+        idx = idx[:limit]
+    return [_all_records[i] for i in idx.tolist()]
+
+def find_suitable_crops(ph: float, rain: float, temp: float, limit: int = None):
+    """
+    Returns every EcoCrop species whose absolute pH, rainfall and temperature ranges
+    all contain the given conditions.
+
+    Parameters:
+        ph (float): Soil pH
+        rain (float): Annual rainfall in mm
+        temp (float): Temperature in Celsius
+        limit (int): Optional cap on the number of species returned
+
+    Returns:
+        List[Dict]: Each dict contains ScientificName, COMNAME, PHMIN, PHMAX, RMIN, RMAX, TMIN, TMAX
+    """
+    idx = np.flatnonzero(_suitable_mask(ph, rain, temp))
+    return _records(idx, limit)
+
+def find_suitable_crops_batch(phs, rains, temps, limit: int = None):
+    """
+    Batched form of find_suitable_crops for many locations at once.
+
+    Parameters:
+        phs, rains, temps (array-like): Equal-length sequences, one entry per location
+        limit (int): Optional cap on the number of species returned per location
+
+    Returns:
+        List[List[Dict]]: Suitable species for each location, in input order
+    """
+    mask = _suitable_mask(phs, rains, temps)
+    if mask.ndim == 1:
+        mask = mask[None, :]
+    return [_records(np.flatnonzero(row), limit) for row in mask]
+
+def is_crop_suitable(crop_name: str, ph: float, rain: float, temp: float):
+    """
+    True if any EcoCrop species matching crop_name tolerates the given conditions.
+    Used to cross-check classifier recommendations.
+
+    Returns:
+        bool | None: None if EcoCrop has no species by that name
+    """
+    name = crop_name.lower().lstrip("_")
+    idx = _name_index.get(CLASSIFIER_ALIASES.get(name, name))
+    if not idx:
+        return None
+    return bool(_suitable_mask(ph, rain, temp)[idx].any())
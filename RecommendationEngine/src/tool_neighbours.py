@@ -0,0 +1,277 @@
+import os
+import json
+import fcntl
+import threading
+import numpy as np
+import pandas as pd
+
+STORE_DIR = "RecommendationEngine/artifacts/neighbours"
+
+# grid cell size in degrees (~11 km at the equator)
+CELL_DEG = 0.1
+EARTH_RADIUS_KM = 6371.0
+
+# incremental inserts add small fragments to a cell; merge them past this count
+_MAX_FRAGMENTS = 32
+
+# one append-only file per column
+_COLUMNS = {
+    "lat": np.float32,
+    "long": np.float32,
+    "crop": np.int16,
+    "acres": np.float32,
+}
+
+def _cell_keys(lat, lon):
+    """integer grid-cell key for each point"""
+    rows = np.floor((np.asarray(lat, dtype=np.float64) + 90.0) / CELL_DEG).astype(np.int64)
+    cols = np.floor((np.asarray(lon, dtype=np.float64) + 180.0) / CELL_DEG).astype(np.int64)
+    return rows * 10_000 + cols
+
+class NeighbourStore:
+    """
+    Location-aware store of neighbouring farm plantings.
+
+    Plots are kept as columnar NumPy arrays (persisted as one append-only
+    binary file per column) and bucketed into a lat/long grid, so a radius
+    query only touches the handful of cells around the farmer.
+
+    Appends from several processes are serialized by a file lock; each
+    writer first catches up via refresh() so crop codes stay consistent,
+    and other processes pick the new rows up with refresh().
+    """
+
+    def __init__(self, store_dir: str = STORE_DIR):
+        self.store_dir = store_dir
+        self._lock = threading.RLock()
+        self.crops = []
+        self._crop_codes = {}
+        self._data = {name: np.empty(0, dtype=dtype) for name, dtype in _COLUMNS.items()}
+        self._size = 0
+        self._disk_rows = 0   # rows of the column files already in memory
+        self._cells = {}
+        self._load()
+
+    def __len__(self):
+        return self._size
+
+    def _path(self, name):
+        return os.path.join(self.store_dir, f"{name}.bin")
+
+    def _load(self):
+        """load persisted columns and build the cell index in one pass"""
+        vocab_path = os.path.join(self.store_dir, "crops.json")
+        if not os.path.exists(vocab_path):
+            return
+        with open(vocab_path, encoding="utf-8") as f:
+            self.crops = json.load(f)
+        self._crop_codes = {crop: i for i, crop in enumerate(self.crops)}
+        columns = {name: np.fromfile(self._path(name), dtype=dtype) for name, dtype in _COLUMNS.items()}
+        n = min(len(col) for col in columns.values())  # ignore a torn trailing write
+        self._data = {name: col[:n].copy() for name, col in columns.items()}
+        self._size = n
+        self._disk_rows = n
+        self._rebuild_index()
+
+    def _disk_row_count(self):
+        """complete rows on disk: the shortest column, so a torn write is ignored"""
+        sizes = []
+        for name, dtype in _COLUMNS.items():
+            try:
+                sizes.append(os.path.getsize(self._path(name)) // np.dtype(dtype).itemsize)
+            except OSError:
+                return 0
+        return min(sizes)
+
+    def refresh(self) -> int:
+        """
+        Read vocabulary and rows appended to disk by other processes.
+        Returns the number of new plots.
+        """
+        with self._lock:
+            vocab_path = os.path.join(self.store_dir, "crops.json")
+            if not os.path.exists(vocab_path):
+                return 0
+            with open(vocab_path, encoding="utf-8") as f:
+                crops = json.load(f)
+            # the vocabulary only grows, and only under the append lock
+            for crop in crops[len(self.crops):]:
+                self._crop_codes[crop] = len(self.crops)
+                self.crops.append(crop)
+
+            n = self._disk_row_count()
+            if n <= self._disk_rows:
+                return 0
+            new = {}
+            for name, dtype in _COLUMNS.items():
+                with open(self._path(name), "rb") as f:
+                    f.seek(self._disk_rows * np.dtype(dtype).itemsize)
+                    new[name] = np.fromfile(f, dtype=dtype, count=n - self._disk_rows)
+            self._insert(new)
+            added = n - self._disk_rows
+            self._disk_rows = n
+            return added
+
+    def _reserve(self, extra):
+        """grow the column buffers geometrically so single inserts stay amortized O(1)"""
+        needed = self._size + extra
+        capacity = len(self._data["lat"])
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, 1024)
+        for name, dtype in _COLUMNS.items():
+            grown = np.empty(capacity, dtype=dtype)
+            grown[:self._size] = self._data[name][:self._size]
+            self._data[name] = grown
+
+    def _rebuild_index(self):
+        n = self._size
+        keys = _cell_keys(self._data["lat"][:n], self._data["long"][:n])
+        order = np.argsort(keys, kind="stable")
+        unique, starts = np.unique(keys[order], return_index=True)
+        bounds = np.append(starts, len(order))
+        self._cells = {
+            int(key): [order[bounds[i]:bounds[i + 1]]]
+            for i, key in enumerate(unique)
+        }
+
+    def _encode(self, crops):
+        names, inverse = np.unique(np.asarray(crops, dtype=str), return_inverse=True)
+        lookup = np.empty(len(names), dtype=np.int16)
+        for i, crop in enumerate(names):
+            crop = crop.strip().lower()
+            code = self._crop_codes.get(crop)
+            if code is None:
+                code = len(self.crops)
+                self.crops.append(crop)
+                self._crop_codes[crop] = code
+            lookup[i] = code
+        return lookup[inverse.reshape(-1)]
+
+    def _insert(self, new):
+        """append encoded columns to memory and the cell index (caller holds the lock)"""
+        start = self._size
+        self._reserve(len(new["lat"]))
+        for name in _COLUMNS:
+            self._data[name][start:start + len(new[name])] = new[name]
+        self._size += len(new["lat"])
+
+        keys = _cell_keys(new["lat"], new["long"])
+        order = np.argsort(keys, kind="stable")
+        unique, starts = np.unique(keys[order], return_index=True)
+        bounds = np.append(starts, len(order))
+        for i, key in enumerate(unique.tolist()):
+            bucket = self._cells.setdefault(key, [])
+            bucket.append(order[bounds[i]:bounds[i + 1]] + start)
+            if len(bucket) > _MAX_FRAGMENTS:
+                bucket[:] = [np.concatenate(bucket)]
+
+    def add_plots(self, lat, long, crop, acres):
+        """
+        Append farm plots to the on-disk columns, the store and the index.
+
+        Args:
+            lat, long (array-like): Plot coordinates in degrees
+            crop (array-like): Crop name per plot
+            acres (array-like): Planted area per plot
+        """
+        os.makedirs(self.store_dir, exist_ok=True)
+        with open(os.path.join(self.store_dir, "append.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with self._lock:
+                    # catch up first so new crops get the next shared code
+                    self.refresh()
+                    new = self._columns(lat, long, crop, acres)
+                    self._append_to_disk(new)
+                    self._insert(new)
+                    self._disk_rows += len(new["lat"])
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _columns(self, lat, long, crop, acres):
+        return {
+            "lat": np.asarray(lat, dtype=np.float32),
+            "long": np.asarray(long, dtype=np.float32),
+            "crop": self._encode(crop),
+            "acres": np.asarray(acres, dtype=np.float32),
+        }
+
+    def _append_to_disk(self, new):
+        vocab_path = os.path.join(self.store_dir, "crops.json")
+        with open(vocab_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.crops, f)
+        os.replace(vocab_path + ".tmp", vocab_path)
+        for name, dtype in _COLUMNS.items():
+            with open(self._path(name), "ab") as f:
+                # drop a torn write from a crashed append so the columns stay aligned
+                f.truncate(self._disk_rows * np.dtype(dtype).itemsize)
+                new[name].tofile(f)
+
+    def add_plot(self, lat: float, long: float, crop: str, acres: float):
+        """register a single farm plot"""
+        self.add_plots([lat], [long], [crop], [acres])
+
+    def ingest_csv(self, file_path: str, chunksize: int = 100_000) -> int:
+        """
+        Stream a CSV with lat, long, crop and acres columns into the store.
+        Returns the number of plots ingested.
+        """
+        total = 0
+        for chunk in pd.read_csv(file_path, usecols=list(_COLUMNS), chunksize=chunksize):
+            chunk = chunk.dropna()
+            self.add_plots(chunk["lat"], chunk["long"], chunk["crop"], chunk["acres"])
+            total += len(chunk)
+        return total
+
+    def compact(self):
+        """merge incremental inserts back into one sorted bucket per cell"""
+        with self._lock:
+            self._rebuild_index()
+
+    def _candidates(self, lat, lon, radius_km):
+        dlat = radius_km / 111.0
+        dlon = radius_km / max(111.0 * np.cos(np.radians(lat)), 1e-6)
+        row_lo, col_lo = divmod(int(_cell_keys(lat - dlat, lon - dlon)), 10_000)
+        row_hi, col_hi = divmod(int(_cell_keys(lat + dlat, lon + dlon)), 10_000)
+        parts = []
+        for row in range(row_lo, row_hi + 1):
+            for col in range(col_lo, col_hi + 1):
+                parts.extend(self._cells.get(row * 10_000 + col, ()))
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(parts)
+
+    def aggregate(self, lat: float, long: float, radius_km: float = 10.0) -> dict:
+        """
+        Total acres per crop planted within radius_km of (lat, long).
+
+        Returns:
+            Dict[str, float]: Crop name -> acres; empty if no plots are nearby
+        """
+        data = self._data
+        idx = self._candidates(lat, long, radius_km)
+        if len(idx) == 0:
+            return {}
+
+        plat = np.radians(data["lat"][idx].astype(np.float64))
+        plon = np.radians(data["long"][idx].astype(np.float64))
+        qlat, qlon = np.radians(lat), np.radians(long)
+        a = (np.sin((plat - qlat) / 2) ** 2
+             + np.cos(qlat) * np.cos(plat) * np.sin((plon - qlon) / 2) ** 2)
+        dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+        near = idx[dist <= radius_km]
+        if len(near) == 0:
+            return {}
+        totals = np.bincount(data["crop"][near], weights=data["acres"][near], minlength=len(self.crops))
+        return {self.crops[i]: float(totals[i]) for i in np.flatnonzero(totals)}
+
+store = NeighbourStore()
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 2:
+        print("usage: python -m RecommendationEngine.src.tool_neighbours <plots.csv>")
+        sys.exit(1)
+    print(f"ingested {store.ingest_csv(sys.argv[1])} plots, {len(store)} in store")
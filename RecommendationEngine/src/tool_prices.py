@@ -0,0 +1,355 @@
+import os
+import re
+import csv
+import json
+import fcntl
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+
+STORE_DIR = "RecommendationEngine/artifacts/prices"
+BASELINE_PATH = "RecommendationEngine/artifacts/crop_prices_yield_revenue.csv"
+
+WINDOW_DAYS = 30
+
+# one append-only record per (series, day) observation; series are (crop, market)
+_RECORD = np.dtype([("series", np.int32), ("day", np.int32), ("price", np.float32)])
+
+# Agmarknet commodity names for the crops the recommender predicts;
+# other commodities are stored under their normalized name
+COMMODITY_ALIASES = {
+    "paddy(dhan)(common)": "rice",
+    "paddy(dhan)(basmati)": "rice",
+    "bengal gram(gram)(whole)": "chickpea",
+    "arhar (tur/red gram)(whole)": "pigeonpeas",
+    "green gram (moong)(whole)": "mungbean",
+    "black gram (urd beans)(whole)": "blackgram",
+    "lentil (masur)(whole)": "lentil",
+    "kapas": "cotton",
+    "water melon": "watermelon",
+    "karbuja(musk melon)": "muskmelon",
+    "coconut seed": "coconut",
+}
+
+_NON_ALPHA = re.compile(r"[^a-z]")
+
+def normalize_crop(commodity: str) -> str:
+    name = str(commodity).strip().lower()
+    return COMMODITY_ALIASES.get(name) or _NON_ALPHA.sub("", name)
+
+def _column(df, *names):
+    """first matching column, ignoring case, spaces and Agmarknet's _x0020_ escapes"""
+    normalized = {c.lower().replace("_x0020_", "_").replace(" ", "_"): c for c in df.columns}
+    for name in names:
+        if name in normalized:
+            return df[normalized[name]]
+    raise KeyError(f"None of {names} found in columns {list(df.columns)}")
+
+class _Series:
+    """
+    Columnar day/price history for one (crop, market), with running sums
+    over the trailing WINDOW_DAYS so mean and slope update in O(1).
+    """
+
+    __slots__ = ("days", "prices", "size", "start", "origin",
+                 "n", "sx", "sy", "sxy", "sxx", "total", "count")
+
+    def __init__(self):
+        self.days = np.empty(16, dtype=np.int32)
+        self.prices = np.empty(16, dtype=np.float32)
+        self.size = 0
+        self.start = 0          # first observation still inside the window
+        self.origin = None      # x is measured from the first day to keep sums small
+        self.n = self.sx = self.sy = self.sxy = self.sxx = 0.0
+        self.total = 0.0        # all-time sum and count, for the long-run mean
+        self.count = 0
+
+    @property
+    def last_day(self):
+        return int(self.days[self.size - 1]) if self.size else None
+
+    def append(self, day: int, price: float):
+        if self.size == len(self.days):
+            self.days = np.resize(self.days, 2 * self.size)
+            self.prices = np.resize(self.prices, 2 * self.size)
+        self.days[self.size] = day
+        self.prices[self.size] = price
+        self.size += 1
+        if self.origin is None:
+            self.origin = day
+
+        x = float(day - self.origin)
+        self.n += 1
+        self.sx += x
+        self.sy += price
+        self.sxy += x * price
+        self.sxx += x * x
+        self.total += price
+        self.count += 1
+
+        cutoff = day - WINDOW_DAYS
+        while self.days[self.start] <= cutoff:
+            old_x = float(self.days[self.start] - self.origin)
+            old_y = float(self.prices[self.start])
+            self.n -= 1
+            self.sx -= old_x
+            self.sy -= old_y
+            self.sxy -= old_x * old_y
+            self.sxx -= old_x * old_x
+            self.start += 1
+
+    def stats(self) -> dict:
+        denominator = self.n * self.sxx - self.sx * self.sx
+        slope = (self.n * self.sxy - self.sx * self.sy) / denominator if self.n > 1 and denominator > 1e-9 else 0.0
+        return {
+            "as_of": str(np.datetime64(self.last_day, "D")),
+            "last_price": float(self.prices[self.size - 1]),
+            "mean_30d": self.sy / self.n,
+            "slope_30d": slope,
+            "observations_30d": int(self.n),
+            "mean_all": self.total / self.count,
+        }
+
+class PriceStore:
+    """
+    Time-series store of mandi (market) modal prices per crop and market.
+
+    Observations are persisted as fixed-size records in one append-only file
+    plus an append-only series vocabulary, and kept in memory as one
+    columnar _Series per (crop, market). Ingesting a file appends only rows
+    newer than each series' last observation; refresh() reads just the
+    bytes other processes appended since the last read.
+
+    Revenue per hectare is the static baseline table scaled by each crop's
+    price index (30-day mean over long-run mean across its markets), so
+    crops without mandi data keep their baseline figure.
+    """
+
+    def __init__(self, store_dir: str = STORE_DIR, baseline_path: str = BASELINE_PATH):
+        self.store_dir = store_dir
+        self.baseline_path = baseline_path
+        self._lock = threading.RLock()
+        self.series = []          # id -> _Series
+        self.keys = []            # id -> (crop, market)
+        self._ids = {}            # (crop, market) -> id
+        self._by_crop = {}        # crop -> [id]
+        self._records_read = 0
+        self._vocab_read = 0
+        self.version = 0
+        self._summary_version = -1
+        self._crop_summary = {}
+        self._revenues = {}
+        self._trends_text = ""
+        self.load_baseline()
+        self.refresh()
+
+    def _path(self, name):
+        return os.path.join(self.store_dir, name)
+
+    def load_baseline(self):
+        baseline = {}
+        with open(self.baseline_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                baseline[row["CROP"].strip().lower()] = float(row["Total Price earned in a hectare"])
+        with self._lock:
+            self.baseline = baseline
+            self.version += 1
+
+    def _series_id(self, crop, market, persist_to=None):
+        key = (crop, market)
+        sid = self._ids.get(key)
+        if sid is None:
+            sid = len(self.series)
+            self._ids[key] = sid
+            self.keys.append(key)
+            self.series.append(_Series())
+            self._by_crop.setdefault(crop, []).append(sid)
+            if persist_to is not None:
+                persist_to.append(json.dumps([crop, market], ensure_ascii=False))
+        return sid
+
+    def refresh(self) -> int:
+        """
+        Apply vocabulary and observations appended on disk since the last read.
+        Returns the number of new observations.
+        """
+        with self._lock:
+            vocab_path = self._path("series.jsonl")
+            if os.path.exists(vocab_path):
+                with open(vocab_path, "rb") as f:
+                    f.seek(self._vocab_read)
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break  # partial write, picked up next time
+                        crop, market = json.loads(line.decode("utf-8"))
+                        self._series_id(crop, market)
+                        self._vocab_read += len(line)
+
+            records_path = self._path("observations.bin")
+            if not os.path.exists(records_path):
+                return 0
+            with open(records_path, "rb") as f:
+                f.seek(self._records_read * _RECORD.itemsize)
+                data = f.read()
+            records = np.frombuffer(data[:len(data) - len(data) % _RECORD.itemsize], dtype=_RECORD)
+            unknown = np.flatnonzero(records["series"] >= len(self.series))
+            if len(unknown):
+                records = records[:unknown[0]]  # wait for the vocabulary line
+            for sid, day, price in zip(records["series"].tolist(), records["day"].tolist(), records["price"].tolist()):
+                self.series[sid].append(day, price)
+            self._records_read += len(records)
+            if len(records):
+                self.version += 1
+            return len(records)
+
+    def ingest(self, df: pd.DataFrame) -> int:
+        """
+        Append mandi rows newer than what each (crop, market) series already has.
+
+        Expects Agmarknet-style columns: Commodity, Market, Arrival_Date
+        (day first) and Modal_Price (or Min/Max_Price). Several rows for the
+        same series and day (varieties, grades) are averaged.
+
+        Returns:
+            int: Number of new observations stored
+        """
+        commodity = _column(df, "commodity", "crop")
+        market = _column(df, "market", "market_name")
+        dates = pd.to_datetime(_column(df, "arrival_date", "date", "price_date"), dayfirst=True, errors="coerce")
+        try:
+            price = pd.to_numeric(_column(df, "modal_price", "price"), errors="coerce")
+        except KeyError:
+            price = (pd.to_numeric(_column(df, "min_price"), errors="coerce")
+                     + pd.to_numeric(_column(df, "max_price"), errors="coerce")) / 2
+
+        rows = pd.DataFrame({
+            "crop": commodity.map(normalize_crop),
+            "market": market.astype(str).str.strip().str.lower(),
+            "day": dates.values.astype("datetime64[D]").astype(np.int64),
+            "price": price,
+        })
+        rows = rows[dates.notna().values & rows["price"].gt(0) & rows["crop"].ne("")]
+        rows = rows.groupby(["crop", "market", "day"], sort=True, as_index=False)["price"].mean()
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        with open(self._path("ingest.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with self._lock:
+                    self.refresh()  # catch up with other writers first
+                    new_vocab, new_records = [], []
+                    for (crop, mkt), group in rows.groupby(["crop", "market"], sort=False):
+                        sid = self._series_id(crop, mkt, persist_to=new_vocab)
+                        last_day = self.series[sid].last_day
+                        fresh = group if last_day is None else group[group["day"] > last_day]
+                        # float32 like the on-disk records, so a reload reproduces the same aggregates
+                        for day, value in zip(fresh["day"].tolist(), fresh["price"].astype(np.float32).tolist()):
+                            self.series[sid].append(day, value)
+                            new_records.append((sid, day, value))
+
+                    # vocabulary first, so readers never see records for unknown series.
+                    # refresh() stopped at the last complete line and record, so anything
+                    # past that is a torn write from a crashed writer: cut it off before
+                    # appending rather than joining it to the new data
+                    if new_vocab:
+                        with open(self._path("series.jsonl"), "ab") as f:
+                            f.truncate(self._vocab_read)
+                            f.write(("\n".join(new_vocab) + "\n").encode("utf-8"))
+                            f.flush()
+                            os.fsync(f.fileno())
+                            self._vocab_read = f.tell()
+                    if new_records:
+                        with open(self._path("observations.bin"), "ab") as f:
+                            f.truncate(self._records_read * _RECORD.itemsize)
+                            np.array(new_records, dtype=_RECORD).tofile(f)
+                            f.flush()
+                            os.fsync(f.fileno())
+                        self._records_read += len(new_records)
+                        self.version += 1
+                    return len(new_records)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def ingest_csv(self, file_path: str, chunksize: int = 200_000) -> int:
+        """Stream a mandi CSV into the store. Returns the number of new observations."""
+        return sum(self.ingest(chunk) for chunk in pd.read_csv(file_path, chunksize=chunksize))
+
+    def series_stats(self, crop: str, market: str):
+        sid = self._ids.get((normalize_crop(crop), str(market).strip().lower()))
+        return None if sid is None else self.series[sid].stats()
+
+    def _summarize(self):
+        """per-crop aggregates across markets, rebuilt once per store version"""
+        with self._lock:
+            if self._summary_version == self.version:
+                return
+            summary = {}
+            for crop, ids in self._by_crop.items():
+                live = [self.series[sid] for sid in ids if self.series[sid].size]
+                if not live:
+                    continue
+                # markets that have reported within the window of the crop's latest price
+                latest = max(series.last_day for series in live)
+                current = [series.stats() for series in live if latest - series.last_day < WINDOW_DAYS]
+                weights = np.array([s["observations_30d"] for s in current], dtype=np.float64)
+                summary[crop] = {
+                    "as_of": str(np.datetime64(latest, "D")),
+                    "markets": len(current),
+                    "mean_30d": float(np.average([s["mean_30d"] for s in current], weights=weights)),
+                    "slope_30d": float(np.average([s["slope_30d"] for s in current], weights=weights)),
+                    "price_index": sum(s["mean_30d"] for s in current) / sum(s["mean_all"] for s in current),
+                }
+            self._crop_summary = summary
+            self._revenues = {
+                crop: revenue * summary[crop]["price_index"] if crop in summary else revenue
+                for crop, revenue in self.baseline.items()
+            }
+
+            parts = []
+            for crop, revenue in self._revenues.items():
+                text = f"{crop} earns {revenue:.0f} per hectare"
+                if crop in summary:
+                    s = summary[crop]
+                    direction = "rising" if s["slope_30d"] > 0 else "falling" if s["slope_30d"] < 0 else "flat"
+                    text += (f" (30-day mandi average {s['mean_30d']:.0f} per quintal, "
+                             f"{direction} {abs(s['slope_30d']):.1f} per day)")
+                parts.append(text)
+            self._trends_text = "Crop earnings per hectare are as follows: " + ", ".join(parts) + "."
+            self._summary_version = self.version
+
+    def crop_stats(self, crop: str):
+        self._summarize()
+        return self._crop_summary.get(normalize_crop(crop))
+
+    def revenue(self, crop: str) -> float:
+        """Expected revenue per hectare, or 0 for crops without a baseline"""
+        self._summarize()
+        return self._revenues.get(str(crop).strip().lower(), 0)
+
+    def revenues(self) -> dict:
+        self._summarize()
+        return self._revenues
+
+    def price_trends_text(self) -> str:
+        """LLM-friendly earnings summary with recent mandi trends where available"""
+        self._summarize()
+        return self._trends_text
+
+    def stats(self) -> dict:
+        return {
+            "series": len(self.series),
+            "observations": self._records_read,
+            "crops_with_prices": len(self._by_crop),
+            "version": self.version,
+        }
+
+store = PriceStore()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest mandi price files into the price store")
+    parser.add_argument("files", nargs="+", help="Agmarknet-style CSV files")
+    args = parser.parse_args()
+    for path in args.files:
+        print(f"{path}: {store.ingest_csv(path)} new observations")
+    print(store.stats())
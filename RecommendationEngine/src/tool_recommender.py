@@ -1,12 +1,46 @@
+import os
 import numpy as np
 import joblib
 import pandas as pd
 
-scaler = joblib.load("RecommendationEngine/models/scaler.pkl")
-le = joblib.load("RecommendationEngine/models/label_encoder.pkl")
-model = joblib.load("RecommendationEngine/models/log_reg_model.pkl")
+from RecommendationEngine.src.tool_prices import store as price_store
+from RecommendationEngine.src.tool_train import MODELS_DIR, CURRENT_FILE, current_dir
 
-df=pd.read_csv("RecommendationEngine/artifacts/crop_prices_yield_revenue.csv")
+PRICES_PATH = price_store.baseline_path
+
+ARTIFACT_FILES = ("scaler.pkl", "label_encoder.pkl", "log_reg_model.pkl")
+FEATURES = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
+
+def _signature(models_dir):
+    """size and mtime of the model artifacts and the baseline price table, which reload() re-reads"""
+    signature = [models_dir]
+    for path in [f"{models_dir}/{name}" for name in ARTIFACT_FILES] + [PRICES_PATH]:
+        st = os.stat(path)
+        signature.append((st.st_size, st.st_mtime_ns))
+    return tuple(signature)
+
+def _load_artifacts(models_dir):
+    """
+    Load scaler, label encoder and model together from one version directory.
+
+    Raises:
+        ValueError: If the three files don't belong to the same training run
+    """
+    scaler, le, model = (joblib.load(f"{models_dir}/{name}") for name in ARTIFACT_FILES)
+    if getattr(scaler, "n_features_in_", len(FEATURES)) != len(FEATURES):
+        raise ValueError(f"Scaler expects {scaler.n_features_in_} features, not {len(FEATURES)}")
+    if len(getattr(model, "classes_", le.classes_)) != len(le.classes_):
+        raise ValueError(f"Model has {len(model.classes_)} classes but the label encoder has {len(le.classes_)}")
+    return scaler, le, model
+
+# one tuple, swapped as a whole, so no caller mixes artifacts from two trainings
+_loaded_dir = current_dir()
+_signature_loaded = _signature(_loaded_dir)
+_artifacts = _load_artifacts(_loaded_dir)
+
+def artifacts():
+    """The current (scaler, label encoder, model)"""
+    return _artifacts
 
 def recommend_crop(N, P, K, temperature, humidity, ph, rainfall, top_k=5):
     """
@@ -22,7 +56,7 @@ def recommend_crop(N, P, K, temperature, humidity, ph, rainfall, top_k=5):
         top_k (int): Number of top crops to recommend
     
     Returns:
-        List[str]: List of top-k recommended crop names
+        List[Dict]: Top-k crops with crop, expected_revenue and model probability
     """
     rain_min = 20.211267
     rain_max = 298.560117
@@ -38,6 +72,8 @@ def recommend_crop(N, P, K, temperature, humidity, ph, rainfall, top_k=5):
         "rainfall": scaled
     }])
     
+    scaler, le, model = _artifacts
+
     # scale
     features_scaled = scaler.transform(features)
     
@@ -49,8 +85,65 @@ def recommend_crop(N, P, K, temperature, humidity, ph, rainfall, top_k=5):
     top_k_labels = le.inverse_transform(top_k_idx)
     
     recommendations = []
-    for crop in top_k_labels:
-        revenue = df.loc[df["CROP"] == crop, "Total Price earned in a hectare"].values[0]
-        recommendations.append({"crop": crop, "expected_revenue": revenue})
+    for crop, idx in zip(top_k_labels, top_k_idx):
+        recommendations.append({"crop": crop, "expected_revenue": price_store.revenue(crop), "probability": float(probs[idx])})
     
-    return recommendations
\ No newline at end of file
+    return recommendations
+
+def recommend_crop_batch(features, top_k=5):
+    """
+    Vectorized recommend_crop for many rows at once.
+    Args:
+        features (pd.DataFrame | dict of arrays): Columns N, P, K, temperature, humidity, ph, rainfall
+        top_k (int): Number of top crops to recommend per row
+
+    Returns:
+        List[List[Dict]]: For each row, top-k crops with crop, expected_revenue and probability
+    """
+    scaler, le, model = _artifacts
+    features = pd.DataFrame(features, columns=FEATURES).astype(float)
+    rain_min = 20.211267
+    rain_max = 298.560117
+    features["rainfall"] = (features["rainfall"] - rain_min) / (rain_max - rain_min) * (rain_max - rain_min) + rain_min
+
+    probs = model.predict_proba(scaler.transform(features))
+    top_k_idx = np.argsort(probs, axis=1)[:, ::-1][:, :top_k]
+    labels = le.inverse_transform(top_k_idx.ravel()).reshape(top_k_idx.shape)
+    top_probs = np.take_along_axis(probs, top_k_idx, axis=1)
+    revenue_lookup = price_store.revenues()
+
+    return [
+        [
+            {"crop": crop, "expected_revenue": revenue_lookup.get(crop, 0), "probability": float(p)}
+            for crop, p in zip(row_labels, row_probs)
+        ]
+        for row_labels, row_probs in zip(labels, top_probs)
+    ]
+
+def reload():
+    """
+    Reload the model artifacts and baseline price table from disk, e.g. after
+    retraining. The CURRENT pointer is read once, so all three come from the
+    same version; they replace the old ones only once all have loaded. On any
+    error the old ones stay in use and the error is raised.
+    """
+    global _artifacts, _signature_loaded, _loaded_dir
+    models_dir = current_dir()
+    signature = _signature(models_dir)
+    loaded = _load_artifacts(models_dir)
+    _artifacts, _signature_loaded, _loaded_dir = loaded, signature, models_dir
+    price_store.load_baseline()
+
+def reload_if_changed() -> bool:
+    """
+    Reload the model artifacts and baseline prices if their files changed
+    since the last load. For processes that don't poll an ArtifactVersion
+    (the bulk-job workers).
+    """
+    try:
+        if _signature(current_dir()) == _signature_loaded:
+            return False
+    except OSError:
+        return False  # mid-replace; keep serving the loaded model
+    reload()
+    return True
@@ -0,0 +1,141 @@
+import csv
+
+REVENUE_PATH = "RecommendationEngine/artifacts/crop_prices_yield_revenue.csv"
+NEIGHBOURS_PATH = "RecommendationEngine/artifacts/neighbours_data.csv"
+
+# how strongly neighbour acreage erodes revenue: a crop holding the average
+# share of planted acreage keeps 1 / (1 + SATURATION_ELASTICITY) of its revenue
+SATURATION_ELASTICITY = 0.5
+# plotted acres within the radius before local data fully replaces the
+# village table; below this the two are blended by acreage
+MIN_LOCAL_ACRES = 100.0
+
+def _read_column(file_path, key_col, value_col):
+    values = {}
+    with open(file_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            values[row[key_col].strip().lower()] = float(row[value_col])
+    return values
+
+revenues = _read_column(REVENUE_PATH, "CROP", "Total Price earned in a hectare")
+village_acres = _read_column(NEIGHBOURS_PATH, "neighbouring_crops", "acres")
+
+def _shares(acres: dict) -> dict:
+    """crop -> share of the total planted acres"""
+    total = sum(max(a, 0.0) for a in acres.values())
+    if total <= 0:
+        return {}
+    return {crop: max(a, 0.0) / total for crop, a in acres.items()}
+
+def local_weight(neighbour_acres: dict) -> float:
+    """weight given to nearby plots against the village survey, 0 to 1"""
+    total = sum(max(a, 0.0) for a in (neighbour_acres or {}).values())
+    if total <= 0:
+        return 0.0
+    return min(1.0, total / MIN_LOCAL_ACRES) if MIN_LOCAL_ACRES > 0 else 1.0
+
+def local_shares(neighbour_acres: dict) -> dict:
+    """
+    Acreage share per crop around the farmer. Local plots are weighted by
+    how much of MIN_LOCAL_ACRES they cover and the village table fills the
+    rest, so a single small plot cannot outweigh the village survey.
+    """
+    village = _shares(village_acres)
+    weight = local_weight(neighbour_acres)
+    if weight <= 0:
+        return village
+    local = _shares(neighbour_acres)
+    return {
+        crop: weight * local.get(crop, 0.0) + (1.0 - weight) * village.get(crop, 0.0)
+        for crop in set(village) | set(local)
+    }
+
+def saturation_factors(shares: dict) -> dict:
+    """
+    Maps each crop to the share of its revenue a farmer can still expect
+    given its share of the acreage already planted nearby. Shares are
+    compared with the average share of a crop in the village table.
+    """
+    if not shares:
+        return {}
+    reference = 1.0 / len(village_acres or shares)
+    return {
+        crop: 1.0 / (1.0 + SATURATION_ELASTICITY * share / reference)
+        for crop, share in shares.items()
+    }
+
+_village_factors = saturation_factors(_shares(village_acres))
+
+def reload():
+    """Re-read the revenue and village acreage tables."""
+    global revenues, village_acres, _village_factors
+    revenues = _read_column(REVENUE_PATH, "CROP", "Total Price earned in a hectare")
+    village_acres = _read_column(NEIGHBOURS_PATH, "neighbouring_crops", "acres")
+    _village_factors = saturation_factors(_shares(village_acres))
+
+def rerank_by_saturation(recommendations: list, neighbour_acres: dict = None) -> list:
+    """
+    Re-ranks classifier recommendations by saturation-adjusted expected revenue.
+
+    Args:
+        recommendations (list): Output of recommend_crop (crop, expected_revenue, probability)
+        neighbour_acres (dict): Crop -> acres planted nearby; defaults to the village table,
+            which also fills in while the local plots are below MIN_LOCAL_ACRES
+
+    Returns:
+        List[Dict]: crop, probability, expected_revenue, saturation_factor,
+        adjusted_revenue and score (probability * adjusted_revenue), best first
+    """
+    factors = _village_factors if neighbour_acres is None else saturation_factors(local_shares(neighbour_acres))
+    ranked = []
+    for rec in recommendations:
+        crop = rec["crop"]
+        revenue = float(rec.get("expected_revenue", revenues.get(crop.lower(), 0.0)))
+        probability = float(rec.get("probability", 1.0))
+        factor = factors.get(crop.lower(), 1.0)
+        adjusted = revenue * factor
+        ranked.append({
+            "crop": crop,
+            "probability": probability,
+            "expected_revenue": revenue,
+            "saturation_factor": factor,
+            "adjusted_revenue": adjusted,
+            "score": probability * adjusted,
+        })
+    ranked.sort(key=lambda r: r["score"], reverse=True)
+    return ranked
+
+def summarize_ranking(ranked: list, neighbour_acres: dict = None) -> str:
+    """
+    Short, deterministic explanation of the top pick, on the quantity the
+    ranking is sorted by: model probability times saturation-adjusted revenue.
+    """
+    if not ranked:
+        return "No crops could be ranked for these conditions."
+    weight = local_weight(neighbour_acres)
+    if weight <= 0:
+        source = "in the village survey"
+    elif weight >= 1:
+        source = "on nearby plots"
+    else:
+        source = f"blending nearby plots ({weight:.0%}) with the village survey"
+    best = ranked[0]
+    share = local_shares(neighbour_acres).get(best["crop"].lower(), 0.0)
+    text = (
+        f"{best['crop']} is the strongest choice for your soil and local market: a "
+        f"{best['probability']:.0%} match for your soil and climate and an expected revenue of "
+        f"{best['adjusted_revenue']:.0f} per hectare after accounting for "
+        f"{best['crop']} covering {share:.0%} of the planted acreage {source}, "
+        f"for a suitability-weighted revenue of {best['score']:.0f}."
+    )
+    if len(ranked) > 1:
+        runner_up = ranked[1]
+        text += (
+            f" {runner_up['crop']} is the next best option at {runner_up['score']:.0f} "
+            f"({runner_up['probability']:.0%} match, {runner_up['adjusted_revenue']:.0f} per hectare)"
+        )
+        if runner_up["adjusted_revenue"] > best["adjusted_revenue"]:
+            text += f"; it earns more per hectare but is a weaker fit for your soil and climate than {best['crop']}."
+        else:
+            text += "."
+    return text
@@ -0,0 +1,189 @@
+import os
+import glob
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+from WeatherAPI.tool_weather_cache import weather_cache
+from RecommendationEngine.src import tool_recommender
+from RecommendationEngine.src.tool_recommender import FEATURES
+from RecommendationEngine.src.tool_prices import store as price_store
+
+TILES_DIR = "RecommendationEngine/artifacts/tiles"
+
+# quantized soil grid, coarse enough to keep tiles small but within
+# the agronomic resolution of a field soil test
+SOIL_LEVELS = {
+    "N": np.arange(0, 141, 20, dtype=np.float32),
+    "P": np.arange(5, 146, 20, dtype=np.float32),
+    "K": np.arange(5, 206, 25, dtype=np.float32),
+    "ph": np.arange(4.5, 8.51, 0.5, dtype=np.float32),
+}
+TOP_K = 5
+
+def _soil_grid():
+    """every combination of soil levels as columns, in N, P, K, ph order"""
+    mesh = np.meshgrid(*SOIL_LEVELS.values(), indexing="ij")
+    return [m.ravel() for m in mesh]
+
+def _top_k_codes(scaler, model, n, p, k, temperature, humidity, ph, rainfall, top_k):
+    """vectorized recommend_crop returning label-encoder codes, best first"""
+    features = np.column_stack([n, p, k, temperature, humidity, ph, rainfall])
+    probs = model.predict_proba(scaler.transform(pd.DataFrame(features, columns=FEATURES)))
+    return np.argsort(probs, axis=1)[:, ::-1][:, :top_k].astype(np.uint8)
+
+def generate_tile(name, lat_range, long_range, step=0.25, top_k=TOP_K, out_dir=TILES_DIR, weather_concurrency=8):
+    """
+    Precompute recommendations over a lat/long grid and the quantized soil grid.
+
+    Weather is fetched once per grid cell (current conditions at generation time)
+    through the weather cache, so it counts against the daily Open-Meteo budget.
+    Cells whose weather can't be fetched are marked missing.
+
+    Args:
+        name (str): Tile name, used as the file name
+        lat_range, long_range (tuple): (min, max) in degrees, inclusive
+        step (float): Grid spacing in degrees
+        top_k (int): Crops stored per cell and soil combination
+
+    Returns:
+        str: Path of the written tile
+    """
+    # one snapshot for the whole tile, so codes and crop names always match
+    scaler, le, model = tool_recommender.artifacts()
+    lats = np.arange(lat_range[0], lat_range[1] + step / 2, step)
+    longs = np.arange(long_range[0], long_range[1] + step / 2, step)
+    cells = [(lat, lon) for lat in lats for lon in longs]
+
+    with ThreadPoolExecutor(max_workers=weather_concurrency) as pool:
+        weathers = list(pool.map(lambda c: weather_cache.get(float(c[0]), float(c[1]), 2024, track_demand=False), cells))
+
+    n, p, k, ph = _soil_grid()
+    soil_shape = tuple(len(levels) for levels in SOIL_LEVELS.values())
+    labels = np.zeros((len(lats), len(longs)) + soil_shape + (top_k,), dtype=np.uint8)
+    valid = np.zeros((len(lats), len(longs)), dtype=bool)
+
+    for idx, weather in enumerate(weathers):
+        i, j = divmod(idx, len(longs))
+        values = [weather.get(key) for key in ("temperature_c", "relative_humidity_percent", "annual_precip_mm")]
+        if any(v is None for v in values):
+            continue
+        temperature, humidity, rainfall = (np.full(len(n), v, dtype=np.float32) for v in values)
+        codes = _top_k_codes(scaler, model, n, p, k, temperature, humidity, ph, rainfall, top_k)
+        labels[i, j] = codes.reshape(soil_shape + (top_k,))
+        valid[i, j] = True
+
+    crops = le.classes_
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{name}.npz")
+    # written beside the target and renamed, so a serving TileStore never reads a
+    # partial tile, and the rename bumps the directory mtime it polls
+    with open(path + ".tmp", "wb") as f:
+        np.savez_compressed(
+            f,
+            lat0=lats[0], long0=longs[0], step=step,
+            valid=valid, labels=labels,
+            crops=crops.astype(str),
+            revenues=np.array([price_store.revenue(c) for c in crops], dtype=np.float32),
+            **{f"levels_{key}": levels for key, levels in SOIL_LEVELS.items()}
+        )
+    os.replace(path + ".tmp", path)
+    return path
+
+class Tile:
+    """One precomputed region, loaded fully into memory."""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        with np.load(path) as data:
+            self.lat0 = float(data["lat0"])
+            self.long0 = float(data["long0"])
+            self.step = float(data["step"])
+            self.valid = data["valid"]
+            self.labels = data["labels"]
+            self.crops = data["crops"].tolist()
+            self.revenues = data["revenues"]
+            self.levels = [data[f"levels_{key}"] for key in SOIL_LEVELS]
+        self.top_k = self.labels.shape[-1]
+
+    def cell(self, lat, long):
+        """grid indices of the cell containing (lat, long), or None if outside/missing"""
+        i = int(round((lat - self.lat0) / self.step))
+        j = int(round((long - self.long0) / self.step))
+        if 0 <= i < self.valid.shape[0] and 0 <= j < self.valid.shape[1] and self.valid[i, j]:
+            return i, j
+        return None
+
+    def lookup(self, lat, long, N, P, K, ph, top_k=None):
+        """
+        Returns None if the tile doesn't cover the point, so top_k is only
+        checked against the tile that would answer.
+
+        Raises:
+            ValueError: If top_k is below 1 or above the crops stored per cell
+        """
+        cell = self.cell(lat, long)
+        if cell is None:
+            return None
+        top_k = self.top_k if top_k is None else top_k
+        if not 1 <= top_k <= self.top_k:
+            raise ValueError(f"top_k must be between 1 and {self.top_k} for tile {self.name}")
+        soil = tuple(int(np.abs(levels - value).argmin()) for levels, value in zip(self.levels, (N, P, K, ph)))
+        codes = self.labels[cell + soil][:top_k]
+        return [
+            {"crop": self.crops[c], "expected_revenue": float(self.revenues[c])}
+            for c in codes.tolist()
+        ]
+
+class TileStore:
+    """All tiles under TILES_DIR; queries go to the first tile covering the point."""
+
+    def __init__(self, tiles_dir=TILES_DIR):
+        self.tiles_dir = tiles_dir
+        self.tiles = []
+        self.reload()
+
+    def reload(self):
+        """re-read every tile; the list is swapped only once all have loaded"""
+        self.tiles = [Tile(path) for path in sorted(glob.glob(os.path.join(self.tiles_dir, "*.npz")))]
+
+    def lookup(self, lat, long, N, P, K, ph, top_k=None):
+        """
+        Precomputed top-k crops for the nearest grid cell and soil class;
+        top_k defaults to every crop the tile stores per cell.
+
+        Returns:
+            Tuple[str, List[Dict]] | None: Tile name and recommendations, or None if no tile covers the point
+        """
+        for tile in self.tiles:
+            recs = tile.lookup(lat, long, N, P, K, ph, top_k)
+            if recs is not None:
+                return tile.name, recs
+        return None
+
+    def list(self):
+        return [
+            {
+                "name": tile.name,
+                "lat_range": [tile.lat0, tile.lat0 + (tile.valid.shape[0] - 1) * tile.step],
+                "long_range": [tile.long0, tile.long0 + (tile.valid.shape[1] - 1) * tile.step],
+                "step": tile.step,
+                "top_k": tile.top_k,
+                "size_bytes": os.path.getsize(tile.path),
+            }
+            for tile in self.tiles
+        ]
+
+store = TileStore()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a precomputed recommendation tile")
+    parser.add_argument("name")
+    parser.add_argument("--lat", nargs=2, type=float, required=True, metavar=("MIN", "MAX"))
+    parser.add_argument("--long", nargs=2, type=float, required=True, metavar=("MIN", "MAX"))
+    parser.add_argument("--step", type=float, default=0.25)
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    args = parser.parse_args()
+    print(generate_tile(args.name, args.lat, args.long, args.step, args.top_k))
@@ -0,0 +1,366 @@
+import os
+import json
+import time
+import uuid
+import pickle
+import shutil
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+import joblib
+import sklearn
+from sklearn.preprocessing import StandardScaler, LabelEncoder
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.naive_bayes import GaussianNB
+
+RAW_PATH = "RecommendationEngine/artifacts/raw/Crop_recommendation.csv"
+MODELS_DIR = "RecommendationEngine/models"
+MODEL_FILE = "log_reg_model.pkl"   # name the recommender loads, whichever candidate is saved
+SCALER_FILE = "scaler.pkl"
+ENCODER_FILE = "label_encoder.pkl"
+META_FILE = "train_meta.json"
+REPLAY_FILE = "replay.pkl"
+# each train/update writes a complete versions/<id> directory, then swaps the
+# CURRENT pointer to it in one rename; without a pointer the top-level files are used
+VERSIONS_DIR = "versions"
+CURRENT_FILE = "CURRENT"
+KEEP_VERSIONS = 3
+# uniform sample of the rows trained on so far, which `update` replays
+# alongside new rows instead of refitting on the whole CSV
+REPLAY_ROWS = 2000
+
+FEATURES = ["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]
+LABEL = "label"
+SEED = 42
+
+# name -> (estimator, hyperparameter grid). Estimators with partial_fit can be
+# updated on new rows alone; the rest are refit by `update`.
+CANDIDATES = {
+    "log_reg": (
+        LogisticRegression(max_iter=2000, random_state=SEED),
+        {"C": [0.1, 1.0, 10.0, 100.0]},
+    ),
+    "sgd": (
+        SGDClassifier(loss="log_loss", max_iter=2000, tol=1e-4, random_state=SEED),
+        {"alpha": [1e-5, 1e-4, 1e-3], "penalty": ["l2", "elasticnet"]},
+    ),
+    "naive_bayes": (
+        GaussianNB(),
+        {"var_smoothing": [1e-9, 1e-7, 1e-5]},
+    ),
+    "random_forest": (
+        RandomForestClassifier(random_state=SEED, n_jobs=1),
+        {"n_estimators": [50, 200], "max_depth": [None, 12]},
+    ),
+}
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def current_dir(models_dir=MODELS_DIR):
+    """directory holding the serving scaler, encoder and model"""
+    try:
+        with open(os.path.join(models_dir, CURRENT_FILE)) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return models_dir
+    return os.path.join(models_dir, VERSIONS_DIR, version)
+
+def _count_rows(path):
+    """data rows in the CSV, including any dropped by load_dataset"""
+    with open(path, "rb") as f:
+        return max(0, sum(1 for _ in f) - 1)
+
+def load_dataset(path=RAW_PATH, skip_rows=0):
+    """
+    Labelled rows from the raw CSV, optionally skipping the first `skip_rows`
+    data rows (already trained on).
+
+    Returns:
+        Tuple[pd.DataFrame, pd.Series]: Features in FEATURES order and labels
+    """
+    df = pd.read_csv(path, skiprows=range(1, skip_rows + 1))
+    df = df.dropna(subset=FEATURES + [LABEL])
+    return df[FEATURES].astype(float), df[LABEL].astype(str)
+
+def measure_latency(model, X, repeats=200):
+    """
+    Median predict_proba latency in microseconds for one row (the API's path)
+    and per row when scoring a batch of 1000.
+    """
+    single = X.iloc[[0]]
+    model.predict_proba(single)  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict_proba(single)
+        timings.append(time.perf_counter() - start)
+
+    batch = X.iloc[np.arange(1000) % len(X)]
+    start = time.perf_counter()
+    model.predict_proba(batch)
+    per_row = (time.perf_counter() - start) / len(batch)
+    return float(np.median(timings) * 1e6), per_row * 1e6
+
+def search_candidates(X, y, names=None, cv=5, n_jobs=-1):
+    """
+    Cross-validated grid search for each candidate on a stratified 80/20 split.
+
+    Each grid is searched in parallel across all cores (n_jobs=-1). The held-out
+    20% is used only for the report, so candidates are compared on equal terms.
+
+    Returns:
+        List[Dict]: One entry per candidate with the fitted best estimator,
+                    best params, CV and holdout accuracy, latency and size
+    """
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, stratify=y, random_state=SEED
+    )
+    folds = StratifiedKFold(n_splits=cv, shuffle=True, random_state=SEED)
+
+    results = []
+    for name in names or CANDIDATES:
+        estimator, grid = CANDIDATES[name]
+        search = GridSearchCV(estimator, grid, cv=folds, scoring="accuracy", n_jobs=n_jobs)
+        start = time.perf_counter()
+        search.fit(X_train, y_train)
+        search_s = time.perf_counter() - start
+
+        best = search.best_estimator_
+        single_us, batch_us = measure_latency(best, X_test)
+        results.append({
+            "name": name,
+            "estimator": best,
+            "params": search.best_params_,
+            "cv_accuracy": float(search.best_score_),
+            "holdout_accuracy": float(best.score(X_test, y_test)),
+            "latency_us": single_us,
+            "batch_latency_us": batch_us,
+            "size_kib": len(pickle.dumps(best)) / 1024,
+            "search_s": search_s,
+        })
+    return results
+
+def format_report(results):
+    header = f"{'model':<14}{'cv acc':>9}{'holdout':>9}{'1-row us':>10}{'batch us/row':>14}{'size KiB':>10}{'search s':>10}  params"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['name']:<14}{r['cv_accuracy']:>9.4f}{r['holdout_accuracy']:>9.4f}"
+            f"{r['latency_us']:>10.1f}{r['batch_latency_us']:>14.2f}{r['size_kib']:>10.1f}"
+            f"{r['search_s']:>10.1f}  {r['params']}"
+        )
+    return "\n".join(lines)
+
+def train(csv_path=RAW_PATH, models_dir=MODELS_DIR, save="log_reg", names=None, cv=5, n_jobs=-1):
+    """
+    Build scaler, label encoder and model artifacts from the raw CSV.
+
+    Args:
+        csv_path (str): Labelled training data
+        models_dir (str): Where the .pkl artifacts and train_meta.json are written
+        save (str | None): Candidate to refit on all rows and save; None only reports
+        names (List[str]): Candidates to search, default all
+        cv (int): Cross-validation folds
+        n_jobs (int): Parallel workers for the search, -1 for all cores
+
+    Returns:
+        List[Dict]: The per-candidate report rows
+    """
+    X_raw, labels = load_dataset(csv_path)
+    le = LabelEncoder().fit(labels)
+    y = le.transform(labels)
+    scaler = StandardScaler().fit(X_raw)
+    X = pd.DataFrame(scaler.transform(X_raw), columns=FEATURES)
+
+    names = list(names or CANDIDATES)
+    if save and save not in names:
+        names.append(save)
+    results = search_candidates(X, y, names, cv=cv, n_jobs=n_jobs)
+    print(format_report(results))
+
+    if save:
+        chosen = next(r for r in results if r["name"] == save)
+        model = sklearn.clone(chosen["estimator"]).fit(X, y)
+        replay = X_raw.assign(**{LABEL: labels}).sample(
+            n=min(REPLAY_ROWS, len(X_raw)), random_state=SEED
+        ).reset_index(drop=True)
+        version_dir = _publish(models_dir, scaler, le, model, replay, {
+            "model": save,
+            "params": chosen["params"],
+            "rows_seen": _count_rows(csv_path),
+            "rows_trained": len(X_raw),
+            "csv_path": csv_path,
+            "csv_sha256": _file_sha256(csv_path),
+            "sklearn_version": sklearn.__version__,
+            "trained_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "updates": 0,
+        })
+        print(f"Saved {save} to {version_dir}")
+    return results
+
+def update(csv_path=RAW_PATH, models_dir=MODELS_DIR):
+    """
+    Incrementally retrain the saved model on rows appended to the CSV since
+    the last train/update.
+
+    Models with partial_fit (sgd, naive_bayes) are updated on the new rows
+    only. Logistic regression is warm-started from its current coefficients
+    on the new rows plus the replay sample of earlier rows, weighted to stand
+    in for all of them, so the cost grows with the new rows rather than the
+    whole CSV. The random forest is refit on the full data. The scaler and
+    label encoder are kept fixed so existing coefficients stay valid; rows
+    with a crop the encoder has never seen need a full `train`.
+
+    The result is written as a new version next to copies of the scaler and
+    encoder it was trained with, and published by swapping CURRENT.
+
+    Returns:
+        int: Number of new rows trained on
+    """
+    source_dir = current_dir(models_dir)
+    meta = _read_meta(source_dir)
+    if meta is None:
+        raise RuntimeError("No training metadata found; run a full train first")
+
+    X_new, labels = load_dataset(csv_path, skip_rows=meta["rows_seen"])
+    if X_new.empty:
+        print("No new rows")
+        return 0
+
+    le = joblib.load(os.path.join(source_dir, ENCODER_FILE))
+    unknown = sorted(set(labels) - set(le.classes_))
+    if unknown:
+        raise ValueError(f"New labels {unknown} are not in the label encoder; run a full train")
+
+    scaler = joblib.load(os.path.join(source_dir, SCALER_FILE))
+    model = joblib.load(os.path.join(source_dir, MODEL_FILE))
+    replay_path = os.path.join(source_dir, REPLAY_FILE)
+    replay = joblib.load(replay_path) if os.path.exists(replay_path) else None
+    rows_trained = meta.get("rows_trained", meta["rows_seen"])
+    new_rows = X_new.assign(**{LABEL: labels}).reset_index(drop=True)
+
+    def scaled(X):
+        return pd.DataFrame(scaler.transform(X[FEATURES]), columns=FEATURES)
+
+    if hasattr(model, "partial_fit"):
+        model.partial_fit(scaled(X_new), le.transform(labels), classes=np.arange(len(le.classes_)))
+    elif isinstance(model, LogisticRegression) and replay is not None \
+            and set(replay[LABEL]) | set(labels) >= set(le.classes_):
+        # earlier rows enter through the replay sample, each weighted for the
+        # rows it stands in for, so the objective matches a full refit's
+        rows = pd.concat([replay, new_rows], ignore_index=True)
+        weights = np.concatenate([np.full(len(replay), rows_trained / len(replay)), np.ones(len(new_rows))])
+        model.set_params(warm_start=True)
+        model.fit(scaled(rows), le.transform(rows[LABEL]), sample_weight=weights)
+    else:
+        # no partial_fit or usable replay sample: refit on the full data
+        X_all, labels_all = load_dataset(csv_path)
+        model.fit(scaled(X_all), le.transform(labels_all))
+
+    replay = _extend_replay(replay, new_rows, rows_trained)
+    rows_total = _count_rows(csv_path)
+    meta.update({
+        "rows_seen": rows_total,
+        "rows_trained": rows_trained + len(new_rows),
+        "csv_sha256": _file_sha256(csv_path),
+        "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "updates": meta.get("updates", 0) + 1,
+    })
+    version_dir = _publish(models_dir, scaler, le, model, replay, meta)
+    print(f"Updated {meta['model']} with {len(X_new)} new rows ({rows_total} total) in {version_dir}")
+    return len(X_new)
+
+def _extend_replay(replay, new_rows, rows_trained, seed=SEED):
+    """reservoir-sample new_rows into the replay sample of the rows_trained rows before them"""
+    if replay is None:
+        replay = new_rows.iloc[:0]
+    fill = max(0, REPLAY_ROWS - len(replay))
+    replay = pd.concat([replay, new_rows.iloc[:fill]], ignore_index=True)
+    rest = new_rows.iloc[fill:]
+    if len(rest):
+        # row t of the stream replaces a random slot with probability REPLAY_ROWS / (t + 1)
+        rng = np.random.default_rng(seed + rows_trained)
+        slots = rng.integers(0, rows_trained + fill + np.arange(len(rest)) + 1)
+        taken = slots < REPLAY_ROWS
+        # a later row in the same slot wins, as it would one row at a time
+        winners = pd.Series(np.flatnonzero(taken), index=slots[taken]).groupby(level=0).last()
+        for column in replay.columns:
+            replay.loc[winners.index, column] = rest[column].to_numpy()[winners.to_numpy()]
+    return replay
+
+def _publish(models_dir, scaler, le, model, replay, meta):
+    """
+    Write a complete version directory, then point CURRENT at it with one
+    rename, so readers see either the old artifacts or the new ones, never a mix.
+    Returns the new version directory.
+    """
+    # names sort in publish order, down to the microsecond
+    now = time.time()
+    version = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now)) + f".{int(now % 1 * 1e6):06d}Z-{uuid.uuid4().hex[:6]}"
+    versions_dir = os.path.join(models_dir, VERSIONS_DIR)
+    version_dir = os.path.join(versions_dir, version)
+    staging = os.path.join(versions_dir, f".{version}.tmp")
+    os.makedirs(staging)
+    joblib.dump(scaler, os.path.join(staging, SCALER_FILE))
+    joblib.dump(le, os.path.join(staging, ENCODER_FILE))
+    joblib.dump(model, os.path.join(staging, MODEL_FILE))
+    joblib.dump(replay, os.path.join(staging, REPLAY_FILE))
+    _write_meta(staging, {**meta, "version": version})
+    os.rename(staging, version_dir)
+
+    pointer = os.path.join(models_dir, CURRENT_FILE)
+    with open(pointer + ".tmp", "w") as f:
+        f.write(version + "\n")
+    os.replace(pointer + ".tmp", pointer)
+
+    # keep a few older versions so readers still loading one aren't cut off
+    older = sorted(name for name in os.listdir(versions_dir) if not name.startswith(".") and name != version)
+    for old in older[:max(0, len(older) - (KEEP_VERSIONS - 1))]:
+        shutil.rmtree(os.path.join(versions_dir, old), ignore_errors=True)
+    return version_dir
+
+def _read_meta(models_dir):
+    path = os.path.join(models_dir, META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def _write_meta(models_dir, meta):
+    path = os.path.join(models_dir, META_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(meta, f, indent=2, default=str)
+    os.replace(path + ".tmp", path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train or incrementally update the crop recommendation model")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = sub.add_parser("train", help="Search all candidates, report, and save one")
+    train_parser.add_argument("--csv", default=RAW_PATH)
+    train_parser.add_argument("--models-dir", default=MODELS_DIR)
+    train_parser.add_argument("--save", default="log_reg", choices=list(CANDIDATES),
+                              help="Candidate to save as the serving model")
+    train_parser.add_argument("--report-only", action="store_true", help="Print the report without saving")
+    train_parser.add_argument("--candidates", nargs="+", choices=list(CANDIDATES))
+    train_parser.add_argument("--cv", type=int, default=5)
+    train_parser.add_argument("--n-jobs", type=int, default=-1)
+
+    update_parser = sub.add_parser("update", help="Retrain on rows appended since the last run")
+    update_parser.add_argument("--csv", default=RAW_PATH)
+    update_parser.add_argument("--models-dir", default=MODELS_DIR)
+
+    args = parser.parse_args()
+    if args.command == "train":
+        train(args.csv, args.models_dir, None if args.report_only else args.save,
+              args.candidates, args.cv, args.n_jobs)
+    else:
+        update(args.csv, args.models_dir)
@@ -68,6 +68,39 @@ def fetch_year_precip(lat: float, lon: float, year: int) -> Optional[float]:
         print("archive fetch failed:", e)
         return None
 
+def _request_time(timestamp: Optional[str] = None) -> datetime:
+    if timestamp:
+        try:
+            return datetime.fromisoformat(timestamp)
+        except Exception:
+            pass
+    return datetime.now(timezone.utc)
+
+def fetch_current(lat: float, lon: float, timestamp: Optional[str] = None) -> dict:
+    """
+    Fetch current temperature and nearest-hour humidity (one Open-Meteo call).
+    returns:
+      {"temperature_c": float|None, "relative_humidity_percent": float|None}
+      or {"error": ..., "detail": ...} if the request failed
+    """
+    req_time = _request_time(timestamp)
+    try:
+        params = {"latitude": lat, "longitude": lon, **API_PARAMS_TEMPLATE}
+        r = requests.get(OPEN_METEO_BASE, params=params, timeout=25)
+        r.raise_for_status()
+        raw = r.json()
+    except Exception as e:
+        return {"error": "open-meteo request failed", "detail": str(e)}
+
+    current = raw.get("current_weather", {}) or {}
+    temp = current.get("temperature")
+    hourly = raw.get("hourly", {}) or {}
+    rh = _pick_nearest_hourly(hourly, req_time.isoformat())
+    return {
+        "temperature_c": float(temp) if temp is not None else None,
+        "relative_humidity_percent": float(rh) if rh is not None else None,
+    }
+
 def get_weather(lat: float, lon: float,
                 timestamp: Optional[str] = None,
                 year: Optional[int] = None) -> dict:
@@ -83,38 +116,18 @@ def get_weather(lat: float, lon: float,
         "annual_precip_mm": float|None   # full year (past) or year-to-date (current year)
       }
     """
-    # pick timestamp or now
-    if timestamp:
-        try:
-            req_time = datetime.fromisoformat(timestamp)
-        except Exception:
-            req_time = datetime.now(timezone.utc)
-    else:
-        req_time = datetime.now(timezone.utc)
-
     # default year = current year
     if year is None:
-        year = req_time.year
+        year = _request_time(timestamp).year
 
-    # fetch current + humidity
-    try:
-        params = {"latitude": lat, "longitude": lon, **API_PARAMS_TEMPLATE}
-        r = requests.get(OPEN_METEO_BASE, params=params, timeout=25)
-        r.raise_for_status()
-        raw = r.json()
-    except Exception as e:
-        return {"error": "open-meteo request failed", "detail": str(e)}
-
-    current = raw.get("current_weather", {}) or {}
-    temp = current.get("temperature")
-    hourly = raw.get("hourly", {}) or {}
-    rh = _pick_nearest_hourly(hourly, req_time.isoformat())
+    current = fetch_current(lat, lon, timestamp)
+    if "error" in current:
+        return current
 
     annual = fetch_year_precip(lat, lon, year)
 
     return {
-        "temperature_c": float(temp) if temp is not None else None,
-        "relative_humidity_percent": float(rh) if rh is not None else None,
+        **current,
         "annual_precip_mm": float(annual) if annual is not None else None,
     }
 
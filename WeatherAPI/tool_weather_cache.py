@@ -0,0 +1,240 @@
+# tool_weather_cache.py - cell-keyed weather cache with demand tracking,
+# plus a background scheduler that keeps the busiest cells warm
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from WeatherAPI.tool_weather import fetch_current, fetch_year_precip
+
+logger = logging.getLogger(__name__)
+
+CELL_DECIMALS = 2                 # ~1 km cells
+TTL_S = float(os.getenv("WEATHER_TTL_S", "3600"))
+DEMAND_HALF_LIFE_S = 6 * 3600     # request counts decay so yesterday's peak fades
+MAX_TRACKED_CELLS = 50_000
+# split across gunicorn workers, each of which keeps its own count
+DAILY_BUDGET = int(os.getenv("WEATHER_DAILY_BUDGET", "5000")) // max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+def cell_of(lat: float, lon: float):
+    return (round(lat, CELL_DECIMALS), round(lon, CELL_DECIMALS))
+
+class DailyBudget:
+    """Open-Meteo calls per UTC day, spent by demand misses and the prefetcher alike"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._day = None
+        self.spent = 0
+
+    def _roll(self):
+        today = datetime.now(timezone.utc).date()
+        if today != self._day:
+            self._day = today
+            self.spent = 0
+
+    def spend(self, calls: int = 1):
+        with self._lock:
+            self._roll()
+            self.spent += calls
+
+    def left(self) -> int:
+        with self._lock:
+            self._roll()
+            return self.limit - self.spent
+
+class WeatherCache:
+    """
+    Caches weather per (cell, year) for TTL_S seconds and keeps a decaying
+    request count per cell so the prefetcher knows which cells are hot.
+
+    Annual precipitation is cached separately: a finished year's archive
+    total never changes, so a refresh of an expired entry only re-fetches
+    current conditions. Every upstream call, on demand or prefetched, is
+    counted against `budget`.
+    """
+
+    def __init__(self, ttl_s: float = TTL_S, budget: Optional[DailyBudget] = None):
+        self.ttl_s = ttl_s
+        self.budget = budget or DailyBudget(DAILY_BUDGET)
+        self._lock = threading.Lock()
+        self._entries = {}   # (cell, year) -> (fetched_at, weather)
+        self._demand = {}    # (cell, year) -> (score, updated_at)
+        self._precip = {}    # (cell, year) -> (fetched_at, annual_precip_mm)
+        self.hits = 0
+        self.misses = 0
+
+    def _record(self, key, now):
+        score, updated = self._demand.get(key, (0.0, now))
+        score = score * 0.5 ** ((now - updated) / DEMAND_HALF_LIFE_S) + 1.0
+        self._demand[key] = (score, now)
+        if len(self._demand) > MAX_TRACKED_CELLS:
+            # prune the coldest tenth in one go rather than one cell per request
+            ranked = sorted(self._demand, key=lambda k: self._demand[k][0])
+            for cold in ranked[:MAX_TRACKED_CELLS // 10]:
+                del self._demand[cold]
+
+    def get(self, lat: float, lon: float, year: Optional[int] = None, track_demand: bool = True) -> dict:
+        """
+        get_weather for the cell containing (lat, lon), served from cache while fresh.
+        Bulk callers pass track_demand=False so their one-off cells don't crowd
+        the prefetcher's hot list.
+        """
+        key = (cell_of(lat, lon), year)
+        now = time.time()
+        with self._lock:
+            if track_demand:
+                self._record(key, now)
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl_s:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        return self.refresh(key)
+
+    def _annual_precip(self, key):
+        """archive precipitation for (cell, year), fetched once per finished year"""
+        (lat, lon), year = key
+        year = year or datetime.now(timezone.utc).year
+        now = time.time()
+        with self._lock:
+            entry = self._precip.get(key)
+        # the current year's total is year-to-date and still growing
+        if entry and (year < datetime.now(timezone.utc).year or now - entry[0] < self.ttl_s):
+            return entry[1]
+
+        self.budget.spend()
+        annual = fetch_year_precip(lat, lon, year)
+        if annual is not None:
+            with self._lock:
+                self._precip[key] = (now, float(annual))
+                if len(self._precip) > MAX_TRACKED_CELLS:
+                    self._precip.pop(next(iter(self._precip)))
+        return annual
+
+    def refresh(self, key) -> dict:
+        """fetch and store one (cell, year); errors are returned but not cached"""
+        (lat, lon), _ = key
+        self.budget.spend()
+        weather = fetch_current(lat=lat, lon=lon)
+        if "error" in weather:
+            return weather
+        annual = self._annual_precip(key)
+        weather = {**weather, "annual_precip_mm": float(annual) if annual is not None else None}
+        if None not in weather.values():
+            with self._lock:
+                self._entries[key] = (time.time(), weather)
+        return weather
+
+    def due_for_refresh(self, limit: int, margin_s: float):
+        """hottest cells whose entry is missing or expires within margin_s, hottest first"""
+        now = time.time()
+        with self._lock:
+            ranked = sorted(
+                self._demand.items(),
+                key=lambda item: item[1][0] * 0.5 ** ((now - item[1][1]) / DEMAND_HALF_LIFE_S),
+                reverse=True
+            )
+            due = []
+            for key, _ in ranked[:limit]:
+                entry = self._entries.get(key)
+                if entry is None or now - entry[0] > self.ttl_s - margin_s:
+                    due.append(key)
+            # drop expired entries nobody is asking for any more
+            hot = {key for key, _ in ranked[:limit]}
+            for key in [k for k, (fetched, _) in self._entries.items() if now - fetched > self.ttl_s and k not in hot]:
+                del self._entries[key]
+            return due
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "annual_precip_entries": len(self._precip),
+            "tracked_cells": len(self._demand),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+class PrefetchScheduler:
+    """
+    Background task (started from the FastAPI lifespan) that refreshes the
+    hottest cells shortly before their cache entries expire.
+
+    Upstream load is bounded by `concurrency` simultaneous fetches and the
+    cache's daily budget of Open-Meteo requests, which demand misses spend
+    too; prefetching stops for the day once it is used up.
+    """
+
+    def __init__(self, cache: WeatherCache, hot_cells: int = 200, interval_s: float = 60,
+                 margin_s: float = 300, concurrency: int = 4):
+        self.cache = cache
+        self.hot_cells = hot_cells
+        self.interval_s = interval_s
+        self.margin_s = margin_s
+        self.concurrency = concurrency
+        self._task = None
+        self.refreshed = 0
+        self.failed = 0
+
+    async def run_once(self):
+        due = self.cache.due_for_refresh(self.hot_cells, self.margin_s)
+        due = due[:max(0, self.cache.budget.left())]  # at least one call each
+        if not due:
+            return
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def refresh(key):
+            async with semaphore:
+                if self.cache.budget.left() <= 0:
+                    return
+                weather = await asyncio.to_thread(self.cache.refresh, key)
+                if weather and "error" not in weather:
+                    self.refreshed += 1
+                else:
+                    self.failed += 1
+
+        await asyncio.gather(*(refresh(key) for key in due))
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Weather prefetch failed: {e}")
+            await asyncio.sleep(self.interval_s)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "budget_left_today": self.cache.budget.left(),
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+        }
+
+weather_cache = WeatherCache()
+prefetcher = PrefetchScheduler(
+    weather_cache,
+    hot_cells=int(os.getenv("WEATHER_PREFETCH_CELLS", "200")),
+    interval_s=float(os.getenv("WEATHER_PREFETCH_INTERVAL_S", "60")),
+    concurrency=int(os.getenv("WEATHER_PREFETCH_CONCURRENCY", "4")),
+)
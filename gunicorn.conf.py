@@ -0,0 +1,45 @@
+# gunicorn.conf.py - production launcher for API.main:app
+# usage: gunicorn -c gunicorn.conf.py API.main:app
+#
+# The app is imported once in the master (preload_app), so the classifier,
+# EcoCrop arrays, price tables and neighbour index are loaded a single time
+# and shared copy-on-write by the forked uvicorn workers.
+#
+# State a user's next request depends on is shared between workers: chat
+# memory (SESSIONS_DIR), profiles (PROFILES_DIR), bulk jobs (JOBS_DIR) and the
+# neighbour and price stores on disk. What stays per worker are caches (a
+# miss only costs a recomputation) and the rate limiter and weather budget,
+# whose global limits are split evenly across the workers.
+
+import gc
+import os
+import multiprocessing
+
+# gRPC (used by the Gemini client) must be told to expect fork before it is imported
+os.environ.setdefault("GRPC_ENABLE_FORK_SUPPORT", "1")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# the app is imported after this file, so modules sizing per-worker shares see the real count
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# recycle workers to bound slow leaks; jitter so they don't all restart together.
+# A lone worker is never recycled: its restart would leave nobody serving
+max_requests = int(os.getenv("MAX_REQUESTS", "2000")) if workers > 1 else 0
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "200"))
+
+# after SIGTERM a worker stops accepting connections and uvicorn waits for
+# open requests (including in-flight LLM calls) to finish; this bounds that wait
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+def pre_fork(server, worker):
+    # move everything loaded so far out of the collector's reach so that
+    # refcount/GC bookkeeping in workers doesn't dirty the shared pages
+    gc.freeze()